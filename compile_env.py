@@ -0,0 +1,51 @@
+"""
+Компиляция .env в Python-модуль config_env.py
+
+Использование:
+    python compile_env.py              # .env -> config_env.py
+    python compile_env.py path/.env    # Указать другой файл окружения
+
+Сгенерированный модуль импортируется config.py вместо повторного
+парсинга .env при каждом запуске (байткод кэшируется интерпретатором).
+После изменения .env скрипт нужно запустить заново.
+"""
+
+import sys
+from pathlib import Path
+
+from dotenv import dotenv_values
+
+OUTPUT_PATH = Path(__file__).parent / "config_env.py"
+
+
+def compile_env(env_path: str = ".env") -> Path:
+    """Прочитать .env и записать значения литералами в config_env.py"""
+    values = dotenv_values(env_path)
+
+    bot_token = values.get("BOT_TOKEN")
+    admin_ids_str = values.get("ADMIN_IDS") or ""
+    admin_ids = frozenset(int(id) for id in admin_ids_str.split(",") if id.strip())
+
+    OUTPUT_PATH.write_text(
+        '"""Сгенерировано compile_env.py - не редактировать вручную"""\n\n'
+        f"BOT_TOKEN = {bot_token!r}\n"
+        f"ADMIN_IDS = {admin_ids!r}\n",
+        encoding="utf-8",
+    )
+    return OUTPUT_PATH
+
+
+def main():
+    """Main CLI function"""
+    env_path = sys.argv[1] if len(sys.argv) > 1 else ".env"
+
+    if not Path(env_path).exists():
+        print(f"❌ Error: {env_path} not found")
+        sys.exit(1)
+
+    output = compile_env(env_path)
+    print(f"✅ Compiled {env_path} -> {output.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,40 @@
 
 import os
 import re
+from datetime import timedelta, timezone
+from functools import lru_cache
+from typing import FrozenSet, Optional
 
-import pytz
-from dotenv import load_dotenv
 
-load_dotenv()
+@lru_cache(maxsize=None)
+def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Кэшированное чтение переменной окружения"""
+    return os.environ.get(name, default)
 
-# Telegram
-BOT_TOKEN = os.getenv("BOT_TOKEN")
 
-# Админы (поддержка нескольких)
-ADMIN_IDS_STR = os.getenv("ADMIN_IDS", "")
-if not ADMIN_IDS_STR:
-    raise ValueError("ADMIN_IDS not found in .env file")
+@lru_cache(maxsize=None)
+def get_admin_ids() -> FrozenSet[int]:
+    """ID администраторов из ADMIN_IDS (парсятся один раз, O(1) проверка)"""
+    admin_ids_str = _env("ADMIN_IDS", "")
+    return frozenset(int(id) for id in admin_ids_str.split(",") if id.strip())
 
-ADMIN_IDS = [int(id.strip()) for id in ADMIN_IDS_STR.split(",") if id.strip()]
+
+try:
+    # Предкомпилированное окружение (python compile_env.py) - без парсинга .env
+    from config_env import ADMIN_IDS, BOT_TOKEN
+except ImportError:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    # Telegram
+    BOT_TOKEN = _env("BOT_TOKEN")
+
+    # Админы (поддержка нескольких)
+    if not _env("ADMIN_IDS"):
+        raise ValueError("ADMIN_IDS not found in .env file")
+
+    ADMIN_IDS = get_admin_ids()
 
 # Валидация токена бота
 if not BOT_TOKEN:
@@ -40,18 +59,24 @@ CANCELLATION_HOURS = 24
 WORK_HOURS_START = 9
 WORK_HOURS_END = 19
 
+# Слоты рабочего дня ("09:00", ...) - вычисляются один раз при импорте
+WORK_SLOTS = tuple(f"{hour:02d}:00" for hour in range(WORK_HOURS_START, WORK_HOURS_END))
+
 # Настройки услуги
 SERVICE_DURATION = "1 час"
 SERVICE_LOCATION = "г. Москва, ул. Примерная, 1 / Онлайн"
 SERVICE_PRICE = "3000 ₽"
 
-# Временная зона (ИСПРАВЛЕНО: используем pytz для корректной обработки DST)
-TIMEZONE = pytz.timezone("Europe/Moscow")
+# Временная зона: Москва - фиксированный UTC+3 без перехода на летнее время,
+# поэтому статическое смещение вместо чтения tzdata (pytz/zoneinfo)
+TIMEZONE = timezone(timedelta(hours=3), "MSK")
 
 # Тайминги и задержки (в секундах)
 ONBOARDING_DELAY_SHORT = 1.0  # Короткая задержка между сообщениями
 ONBOARDING_DELAY_LONG = 4.0   # Длинная задержка для чтения
-BROADCAST_DELAY = 0.05        # Задержка между сообщениями в рассылке (50ms)
+BROADCAST_RATE = 25           # Сообщений в секунду при рассылке (лимит Telegram - 30)
+BROADCAST_CONCURRENCY = 50    # Одновременных отправок при рассылке
+BROADCAST_QUEUE_SIZE = 500    # Очередь user_id между чтением из БД и отправкой
 RATE_LIMIT_TIME = 1.0         # Время между действиями одного пользователя
 
 # FSM таймауты (в секундах)
@@ -61,7 +86,7 @@ FSM_STATE_TTL = 600  # 10 минут - автоматический сброс 
 CALENDAR_MAX_MONTHS_AHEAD = 3  # Максимум месяцев вперёд для бронирования
 
 # Названия месяцев
-MONTH_NAMES = [
+MONTH_NAMES = (
     "Январь",
     "Февраль",
     "Март",
@@ -74,10 +99,10 @@ MONTH_NAMES = [
     "Октябрь",
     "Ноябрь",
     "Декабрь",
-]
+)
 
 # Названия дней недели
-DAY_NAMES = [
+DAY_NAMES = (
     "понедельник",
     "вторник",
     "среду",
@@ -85,6 +110,6 @@ DAY_NAMES = [
     "пятницу",
     "субботу",
     "воскресенье",
-]
+)
 
-DAY_NAMES_SHORT = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+DAY_NAMES_SHORT = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
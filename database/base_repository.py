@@ -1,20 +1,107 @@
 """Базовый класс для всех репозиториев"""
 
+import asyncio
 import logging
-from typing import Any, Optional
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Union
 
 import aiosqlite
 
 from config import DATABASE_PATH
+from database.pool import ConnectionPool
+
+# Строк за одну транзакцию при массовом удалении
+DELETE_CHUNK_SIZE = 1000
 
 
 class BaseRepository:
     """Базовый класс репозитория с общими методами"""
 
+    # Общий пул для всех репозиториев: один писатель в режиме автокоммита
+    # и несколько читателей. Явные транзакции (BEGIN IMMEDIATE) выполняются
+    # в отдельных соединениях пула (acquire_transactional, см. BookingService).
+    _pool: Optional[ConnectionPool] = None
+    _pool_lock = asyncio.Lock()
+
+    # Часто выполняемые запросы под постоянными именами. Кэш выражений sqlite3
+    # (CACHED_STATEMENTS в database/pool.py) ищет по равному тексту SQL, а не
+    # по тому же объекту строки: повторно используется любой запрос с
+    # неизменным текстом (значения - только через параметры), где бы ни
+    # была объявлена строка
+    _stmts: Dict[str, str] = {
+        "log_event": (
+            "INSERT INTO analytics (user_id, event, data, timestamp) VALUES (?, ?, ?, ?)"
+        ),
+        "slot_taken": (
+            "SELECT EXISTS(SELECT 1 FROM bookings WHERE date=?1 AND time=?2) "
+            "OR EXISTS(SELECT 1 FROM blocked_slots WHERE date=?1 AND time=?2)"
+        ),
+        "add_user": (
+            "INSERT INTO users (user_id, first_seen) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO NOTHING RETURNING user_id"
+        ),
+    }
+
+    @staticmethod
+    async def get_pool() -> ConnectionPool:
+        """Получить пул соединений (открывается при первом обращении)"""
+        if BaseRepository._pool is None:
+            async with BaseRepository._pool_lock:
+                if BaseRepository._pool is None:
+                    pool = ConnectionPool(DATABASE_PATH)
+                    await pool.open()
+                    BaseRepository._pool = pool
+        return BaseRepository._pool
+
+    @staticmethod
+    async def close_pool():
+        """Закрыть пул соединений (при остановке бота)"""
+        if BaseRepository._pool is not None:
+            await BaseRepository._pool.close()
+            BaseRepository._pool = None
+
+    @staticmethod
+    async def schedule_optimize():
+        """Обновить статистику планировщика в фоне после массовой записи"""
+        pool = await BaseRepository.get_pool()
+        pool.schedule_optimize()
+
+    @staticmethod
+    @asynccontextmanager
+    async def acquire_read() -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение только для чтения из пула"""
+        pool = await BaseRepository.get_pool()
+        async with pool.acquire_read() as db:
+            yield db
+
+    @staticmethod
+    @asynccontextmanager
+    async def acquire_snapshot() -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение только для чтения с единым снимком на весь блок"""
+        pool = await BaseRepository.get_pool()
+        async with pool.acquire_snapshot() as db:
+            yield db
+
+    @staticmethod
+    @asynccontextmanager
+    async def acquire_write() -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение-писатель из пула"""
+        pool = await BaseRepository.get_pool()
+        async with pool.acquire_write() as db:
+            yield db
+
+    @staticmethod
+    @asynccontextmanager
+    async def acquire_transactional() -> AsyncIterator[aiosqlite.Connection]:
+        """Соединение пула для явной транзакции"""
+        pool = await BaseRepository.get_pool()
+        async with pool.acquire_transactional() as db:
+            yield db
+
     @staticmethod
     async def _execute_query(
         query: str,
-        params: tuple = (),
+        params: Union[tuple, dict] = (),
         fetch_one: bool = False,
         fetch_all: bool = False,
         commit: bool = False,
@@ -24,16 +111,18 @@ class BaseRepository:
 
         Args:
             query: SQL запрос
-            params: Параметры запроса
+            params: Параметры запроса (кортеж или словарь для :name)
             fetch_one: Вернуть одну строку
             fetch_all: Вернуть все строки
-            commit: Сделать commit
+            commit: Сделать commit (запрос на запись - выполняется писателем,
+                без commit запрос уходит читателю)
 
         Returns:
             Результат запроса или None
         """
+        acquire = BaseRepository.acquire_write if commit else BaseRepository.acquire_read
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with acquire() as db:
                 async with db.execute(query, params) as cursor:
                     if fetch_one:
                         result = await cursor.fetchone()
@@ -45,11 +134,18 @@ class BaseRepository:
                 if commit:
                     await db.commit()
 
-                return result
+            return result
         except Exception as e:
             logging.error(f"Database error in query '{query[:50]}...': {e}")
             return None
 
+    @staticmethod
+    async def prepared(name: str, params: tuple = (), **kwargs) -> Optional[Any]:
+        """Выполнить именованный запрос из _stmts (см. _execute_query)"""
+        return await BaseRepository._execute_query(
+            BaseRepository._stmts[name], params, **kwargs
+        )
+
     @staticmethod
     async def _execute_many(query: str, params_list: list, commit: bool = True) -> bool:
         """
@@ -58,17 +154,27 @@ class BaseRepository:
         Args:
             query: SQL запрос
             params_list: Список параметров
-            commit: Сделать commit
+            commit: Выполнить одной транзакцией с commit
 
         Returns:
             True если успешно
         """
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
-                await db.executemany(query, params_list)
-                if commit:
+            async with BaseRepository.acquire_write() as db:
+                if not commit:
+                    await db.executemany(query, params_list)
+                    return True
+
+                # В режиме автокоммита каждая строка была бы отдельной
+                # транзакцией (и fsync) - пачка пишется одной
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    await db.executemany(query, params_list)
                     await db.commit()
-                return True
+                except Exception:
+                    await db.rollback()
+                    raise
+            return True
         except Exception as e:
             logging.error(f"Database error in executemany: {e}")
             return False
@@ -108,3 +214,37 @@ class BaseRepository:
         query = f"SELECT 1 FROM {table} WHERE {where} LIMIT 1"
         result = await BaseRepository._execute_query(query, params, fetch_one=True)
         return result is not None
+
+    @staticmethod
+    async def _delete_in_chunks(
+        table: str, where: str, params: tuple, chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> int:
+        """
+        Удалить записи порциями по chunk_size
+
+        Каждая порция - отдельная короткая транзакция (автокоммит), между
+        порциями писатель освобождается для других корутин.
+
+        Args:
+            table: Название таблицы
+            where: WHERE условие (без WHERE)
+            params: Параметры для WHERE
+            chunk_size: Строк за одну транзакцию
+
+        Returns:
+            Количество удаленных записей
+        """
+        # DELETE ... LIMIT требует особой сборки SQLite - выбираем rowid подзапросом
+        query = (
+            f"DELETE FROM {table} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {where} LIMIT ?)"
+        )
+        total = 0
+        while True:
+            async with BaseRepository.acquire_write() as db:
+                cursor = await db.execute(query, (*params, chunk_size))
+                deleted = cursor.rowcount
+            total += deleted
+            if deleted < chunk_size:
+                return total
+            await asyncio.sleep(0)
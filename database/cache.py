@@ -0,0 +1,130 @@
+"""Кэш результатов запросов календаря с TTL и LRU-вытеснением"""
+
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+DEFAULT_TTL = 60
+DEFAULT_MAXSIZE = 512
+
+
+class Uncached(NamedTuple):
+    """
+    Результат, который нельзя кэшировать (запасное значение при ошибке БД).
+
+    Кэшируемая функция возвращает Uncached(value): декоратор cached отдаёт
+    вызывающему value, но не сохраняет его.
+    """
+
+    value: Any
+
+
+class ResultCache:
+    """
+    In-process кэш результатов запросов.
+
+    Ключи:
+        ms:YYYY-MM     - статусы дней месяца
+        ds:YYYY-MM-DD  - статус дня
+        os:YYYY-MM-DD  - занятые слоты дня
+        cs:USER_ID     - статистика клиента
+        fs:USER_ID     - любимые слоты клиента
+        bs:YYYY-MM-DD  - блокировки дня (bs:* - все блокировки)
+
+    Записи живут не дольше ttl секунд и сбрасываются методами записи
+    через invalidate_date(). Сброс увеличивает поколение ключа: результат
+    чтения, начатого до сброса, не сохраняется. Возвращаемые значения общие
+    для всех вызывающих - кэшируемые функции возвращают frozenset/неизменяемые
+    данные либо значения, которые вызывающие не изменяют.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, maxsize: int = DEFAULT_MAXSIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Поколения сброшенных ключей и общее поколение clear()
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Вернуть (найдено, значение) с учётом TTL"""
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return False, None
+
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any):
+        """Сохранить значение, вытесняя самые старые записи"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def generation(self, key: str) -> Tuple[int, int]:
+        """Текущее поколение ключа (меняется при каждом его сбросе)"""
+        return self._epoch, self._generations.get(key, 0)
+
+    def invalidate(self, key: str):
+        """Сбросить ключ и увеличить его поколение"""
+        self._data.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate_date(self, date_str: str):
+        """Сбросить кэш дня и его месяца после записи"""
+        self.invalidate(f"ds:{date_str}")
+        self.invalidate(f"os:{date_str}")
+        self.invalidate(f"ms:{date_str[:7]}")
+        self.invalidate(f"bs:{date_str}")
+        self.invalidate("bs:*")
+
+    def invalidate_user(self, user_id: int):
+        """Сбросить кэш профиля пользователя после его записи/отмены/отзыва"""
+        self.invalidate(f"cs:{user_id}")
+        self.invalidate(f"fs:{user_id}")
+
+    def clear(self):
+        """Сбросить весь кэш (массовые удаления)"""
+        self._data.clear()
+        # Новое общее поколение заменяет поколения отдельных ключей
+        self._generations.clear()
+        self._epoch += 1
+
+    def cached(self, key_func: Callable[..., str]):
+        """
+        Декоратор для async-функций: key_func(*args) -> ключ кэша.
+
+        Не сохраняет исключения, результаты Uncached и результаты чтений,
+        во время которых ключ был сброшен.
+        """
+
+        def decorator(func: Callable):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = key_func(*args, **kwargs)
+                found, value = self.get(key)
+                if found:
+                    return value
+
+                generation = self.generation(key)
+                value = await func(*args, **kwargs)
+                if isinstance(value, Uncached):
+                    return value.value
+                if self.generation(key) == generation:
+                    self.set(key, value)
+                return value
+
+            return wrapper
+
+        return decorator
+
+
+# Общий кэш для репозиториев и сервисов
+result_cache = ResultCache()
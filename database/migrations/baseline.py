@@ -0,0 +1,76 @@
+"""Консолидированная схема БД для чистой установки
+
+Соответствует результату применения миграций v001-v007 и позволяет
+создать новую базу одним executescript вместо поочередного прогона
+миграций. При добавлении миграции, меняющей схему, обновите BASELINE_SQL
+и BASELINE_VERSION (или оставьте как есть - новые миграции применятся
+поверх базовой схемы инкрементально).
+"""
+
+BASELINE_VERSION = 7
+
+BASELINE_SQL = """
+    CREATE TABLE IF NOT EXISTS bookings
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        created_at TEXT NOT NULL,
+        version INTEGER DEFAULT 1,
+        UNIQUE(date, time));
+
+    CREATE TABLE IF NOT EXISTS users
+        (user_id INTEGER PRIMARY KEY, first_seen TEXT NOT NULL);
+
+    CREATE TABLE IF NOT EXISTS analytics
+        (user_id INTEGER, event TEXT, data TEXT, timestamp TEXT);
+
+    CREATE TABLE IF NOT EXISTS feedback
+        (user_id INTEGER, booking_id INTEGER, rating INTEGER, timestamp TEXT);
+
+    CREATE TABLE IF NOT EXISTS blocked_slots
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        reason TEXT,
+        blocked_by INTEGER NOT NULL,
+        blocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(date, time));
+
+    CREATE TABLE IF NOT EXISTS admin_sessions
+        (user_id INTEGER PRIMARY KEY, message_id INTEGER, updated_at TEXT);
+
+    CREATE TABLE IF NOT EXISTS user_booking_counts
+        (user_id INTEGER PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0);
+
+    CREATE TABLE IF NOT EXISTS app_stats
+        (id INTEGER PRIMARY KEY CHECK (id = 1),
+        total_users INTEGER NOT NULL DEFAULT 0);
+    INSERT OR IGNORE INTO app_stats (id, total_users) VALUES (1, 0);
+
+    CREATE INDEX IF NOT EXISTS idx_analytics_timestamp ON analytics(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON feedback(timestamp);
+    CREATE INDEX IF NOT EXISTS idx_bookings_user_cov
+        ON bookings(user_id, date, time, username, created_at);
+    CREATE INDEX IF NOT EXISTS idx_analytics_user_event_ts
+        ON analytics(user_id, event, timestamp DESC, data);
+    CREATE INDEX IF NOT EXISTS idx_feedback_user_rating ON feedback(user_id, rating);
+    CREATE INDEX IF NOT EXISTS idx_ubc_n ON user_booking_counts(n DESC);
+
+    CREATE TRIGGER IF NOT EXISTS trg_booking_count AFTER INSERT ON bookings
+    BEGIN
+        INSERT INTO user_booking_counts (user_id, n) VALUES (NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET n = n + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_users_count_ins AFTER INSERT ON users
+    BEGIN
+        UPDATE app_stats SET total_users = total_users + 1 WHERE id = 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_users_count_del AFTER DELETE ON users
+    BEGIN
+        UPDATE app_stats SET total_users = total_users - 1 WHERE id = 1;
+    END;
+"""
@@ -1,16 +1,25 @@
 """Менеджер миграций БД"""
 
 import logging
-from typing import List, Type
+from bisect import insort
+from typing import List, Optional, Type
 import aiosqlite
 from abc import ABC, abstractmethod
 
+from database.migrations.baseline import BASELINE_SQL, BASELINE_VERSION
+
+INSERT_MIGRATION_SQL = "INSERT INTO schema_migrations (version, description) VALUES (?, ?)"
+DELETE_MIGRATION_SQL = "DELETE FROM schema_migrations WHERE version=?"
+
 
 class Migration(ABC):
     """Базовый класс для миграций"""
     
     version: int
     description: str
+    # SQL-скрипты миграции: если заданы, применяются одним executescript
+    sql_script: Optional[str] = None
+    downgrade_script: Optional[str] = None
     
     @abstractmethod
     async def upgrade(self, db: aiosqlite.Connection):
@@ -31,84 +40,153 @@ class MigrationManager:
         self.migrations: List[Type[Migration]] = []
     
     def register(self, migration_class: Type[Migration]):
-        """Регистрация миграции"""
-        self.migrations.append(migration_class)
-        self.migrations.sort(key=lambda m: m.version)
+        """Регистрация миграции (список остается отсортированным по версии)"""
+        insort(self.migrations, migration_class, key=lambda m: m.version)
     
-    async def init_migrations_table(self):
-        """Создание таблицы миграций"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS schema_migrations
-                (version INTEGER PRIMARY KEY,
-                 description TEXT,
-                 applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
-            )
-            await db.commit()
+    async def init_migrations_table(self, db: aiosqlite.Connection):
+        """Создание таблицы миграций и настройка PRAGMA
+
+        WAL позволяет читателям работать параллельно с писателем.
+        Режим сохраняется в файле БД, но требует поддержки файловых
+        блокировок ОС (не работает на сетевых файловых системах).
+        page_size задается до перехода в WAL и до первой таблицы - иначе
+        он игнорируется (для существующей базы нужен VACUUM).
+        """
+        await db.executescript(
+            """PRAGMA page_size=8192;
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA busy_timeout=5000;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-20000;"""
+        )
+        await db.execute(
+            """CREATE TABLE IF NOT EXISTS schema_migrations
+            (version INTEGER PRIMARY KEY,
+             description TEXT,
+             applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
+        )
+        await db.commit()
     
-    async def get_current_version(self) -> int:
-        """Получить текущую версию схемы"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT MAX(version) FROM schema_migrations"
-            ) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result and result[0] else 0
+    async def get_current_version(self, db: Optional[aiosqlite.Connection] = None) -> int:
+        """Получить текущую версию схемы (в переданном или новом соединении)"""
+        if db is None:
+            async with aiosqlite.connect(self.db_path) as db:
+                return await self.get_current_version(db)
+
+        async with db.execute(
+            "SELECT COALESCE(MAX(version), 0) FROM schema_migrations"
+        ) as cursor:
+            return (await cursor.fetchone())[0]
     
+    async def bootstrap_fresh(
+        self, db: aiosqlite.Connection, baseline_sql: str, final_version: int
+    ) -> bool:
+        """Создать схему пустой БД одним скриптом вместо прогона миграций
+
+        Returns:
+            True если база была пустой и схема создана
+        """
+        async with db.execute(
+            """SELECT COUNT(*) FROM sqlite_master
+            WHERE type='table' AND name != 'schema_migrations'
+            AND name NOT LIKE 'sqlite_%'"""
+        ) as cursor:
+            if (await cursor.fetchone())[0]:
+                return False
+
+        try:
+            await db.executescript(f"BEGIN IMMEDIATE;\n{baseline_sql}")
+            # Отмечаем все покрытые версии, чтобы rollback работал как обычно
+            await db.executemany(
+                INSERT_MIGRATION_SQL,
+                [
+                    (m.version, m.description)
+                    for m in self.migrations
+                    if m.version <= final_version
+                ],
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logging.error("Baseline schema bootstrap failed: %s", e)
+            raise
+
+        logging.info("Fresh database bootstrapped at version %d", final_version)
+        return True
+
     async def migrate(self, target_version: int = None):
-        """Применить миграции до target_version"""
-        await self.init_migrations_table()
-        current = await self.get_current_version()
+        """Применить миграции до target_version (одно соединение на весь запуск)"""
         target = target_version or (max(m.version for m in self.migrations) if self.migrations else 0)
-        
-        if current >= target:
-            logging.info(f"Database already at version {current}")
-            return
-        
-        async with aiosqlite.connect(self.db_path) as db:
+
+        # Автокоммит + явный BEGIN IMMEDIATE: блокировка записи берется сразу,
+        # без повышения DEFERRED-транзакции (и SQLITE_BUSY) посреди миграции
+        async with aiosqlite.connect(self.db_path, isolation_level=None) as db:
+            await self.init_migrations_table(db)
+            current = await self.get_current_version(db)
+
+            # Чистая установка: базовая схема одним скриптом
+            if current == 0 and target >= BASELINE_VERSION:
+                if await self.bootstrap_fresh(db, BASELINE_SQL, BASELINE_VERSION):
+                    current = BASELINE_VERSION
+
+            if current >= target:
+                logging.info("Database already at version %d", current)
+                return
+
             for migration_class in self.migrations:
                 if current < migration_class.version <= target:
                     migration = migration_class()
-                    logging.info(f"Applying migration {migration.version}: {migration.description}")
+                    logging.debug(
+                        "Applying migration %d: %s", migration.version, migration.description
+                    )
                     
                     try:
-                        await db.execute("BEGIN")
-                        await migration.upgrade(db)
+                        if migration.sql_script:
+                            # executescript коммитит открытую транзакцию перед
+                            # выполнением, поэтому BEGIN передаем внутри скрипта
+                            await db.executescript(f"BEGIN IMMEDIATE;\n{migration.sql_script}")
+                        else:
+                            await db.execute("BEGIN IMMEDIATE")
+                            await migration.upgrade(db)
                         await db.execute(
-                            "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                            INSERT_MIGRATION_SQL,
                             (migration.version, migration.description)
                         )
                         await db.commit()
-                        logging.info(f"Migration {migration.version} applied successfully")
+                        logging.info("Migration %d applied successfully", migration.version)
                     except Exception as e:
                         await db.rollback()
-                        logging.error(f"Migration {migration.version} failed: {e}")
+                        logging.error("Migration %d failed: %s", migration.version, e)
                         raise
     
     async def rollback(self, target_version: int):
         """Откатить миграции до target_version"""
-        current = await self.get_current_version()
-        
-        if current <= target_version:
-            logging.info("Nothing to rollback")
-            return
-        
-        async with aiosqlite.connect(self.db_path) as db:
+        async with aiosqlite.connect(self.db_path, isolation_level=None) as db:
+            current = await self.get_current_version(db)
+
+            if current <= target_version:
+                logging.info("Nothing to rollback")
+                return
+
             for migration_class in reversed(self.migrations):
                 if target_version < migration_class.version <= current:
                     migration = migration_class()
-                    logging.info(f"Rolling back migration {migration.version}")
+                    logging.debug("Rolling back migration %d", migration.version)
                     
                     try:
-                        await db.execute("BEGIN")
-                        await migration.downgrade(db)
+                        if migration.downgrade_script:
+                            await db.executescript(f"BEGIN IMMEDIATE;\n{migration.downgrade_script}")
+                        else:
+                            await db.execute("BEGIN IMMEDIATE")
+                            await migration.downgrade(db)
                         await db.execute(
-                            "DELETE FROM schema_migrations WHERE version=?",
-                            (migration.version,)
+                            DELETE_MIGRATION_SQL, (migration.version,)
                         )
                         await db.commit()
-                        logging.info(f"Migration {migration.version} rolled back")
+                        logging.info("Migration %d rolled back", migration.version)
                     except Exception as e:
                         await db.rollback()
-                        logging.error(f"Rollback {migration.version} failed: {e}")
+                        logging.error("Rollback %d failed: %s", migration.version, e)
                         raise
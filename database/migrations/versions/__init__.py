@@ -2,5 +2,22 @@
 
 from database.migrations.versions.v001_initial_schema import InitialSchema
 from database.migrations.versions.v002_add_version_column import AddVersionColumn
+from database.migrations.versions.v003_drop_duplicate_indexes import (
+    DropDuplicateIndexes,
+)
+from database.migrations.versions.v004_covering_indexes import CoveringIndexes
+from database.migrations.versions.v005_drop_redundant_slot_indexes import (
+    DropRedundantSlotIndexes,
+)
+from database.migrations.versions.v006_user_booking_counts import AddUserBookingCounts
+from database.migrations.versions.v007_app_stats import AddAppStats
 
-__all__ = ["InitialSchema", "AddVersionColumn"]
+__all__ = [
+    "InitialSchema",
+    "AddVersionColumn",
+    "DropDuplicateIndexes",
+    "CoveringIndexes",
+    "DropRedundantSlotIndexes",
+    "AddUserBookingCounts",
+    "AddAppStats",
+]
@@ -1,5 +1,7 @@
 """Добавление колонки version для оптимистичной блокировки"""
 
+import aiosqlite
+
 from database.migrations.migration_manager import Migration
 
 
@@ -7,30 +9,41 @@ class AddVersionColumn(Migration):
     version = 2
     description = "Add version column for optimistic locking in bookings"
     
+    # SQLite не поддерживает DROP COLUMN, поэтому пересоздаем таблицу целиком
+    # (с ограничениями) и строим индексы уже после переноса строк
+    downgrade_script = """
+        PRAGMA defer_foreign_keys=ON;
+
+        CREATE TABLE bookings_backup
+            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            username TEXT,
+            created_at TEXT NOT NULL,
+            UNIQUE(date, time));
+
+        INSERT INTO bookings_backup (id, date, time, user_id, username, created_at)
+            SELECT id, date, time, user_id, username, created_at FROM bookings;
+
+        DROP TABLE bookings;
+        ALTER TABLE bookings_backup RENAME TO bookings;
+
+        -- Восстанавливаем индексы
+        CREATE INDEX idx_bookings_date ON bookings(date, time);
+        CREATE UNIQUE INDEX idx_user_active_bookings ON bookings(user_id, date, time);
+    """
+
     async def upgrade(self, db):
-        # Добавляем колонку version
-        await db.execute("ALTER TABLE bookings ADD COLUMN version INTEGER DEFAULT 1")
+        # Добавляем колонку version (идемпотентно: без чтения PRAGMA table_info)
+        try:
+            await db.execute("ALTER TABLE bookings ADD COLUMN version INTEGER DEFAULT 1")
+        except aiosqlite.OperationalError as e:
+            if "duplicate column" not in str(e):
+                raise
         
         # Обновляем существующие записи
         await db.execute("UPDATE bookings SET version=1 WHERE version IS NULL")
     
     async def downgrade(self, db):
-        # SQLite не поддерживает DROP COLUMN, поэтому пересоздаем таблицу
-        await db.execute(
-            """CREATE TABLE bookings_backup AS 
-            SELECT id, date, time, user_id, username, created_at 
-            FROM bookings"""
-        )
-        await db.execute("DROP TABLE bookings")
-        await db.execute("ALTER TABLE bookings_backup RENAME TO bookings")
-        
-        # Восстанавливаем индексы
-        await db.execute(
-            "CREATE INDEX idx_bookings_date ON bookings(date, time)"
-        )
-        await db.execute(
-            "CREATE INDEX idx_bookings_user ON bookings(user_id)"
-        )
-        await db.execute(
-            "CREATE UNIQUE INDEX idx_user_active_bookings ON bookings(user_id, date, time)"
-        )
+        await db.executescript(self.downgrade_script)
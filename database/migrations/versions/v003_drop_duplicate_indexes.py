@@ -0,0 +1,23 @@
+"""Удаление дублирующих индексов bookings"""
+
+from database.migrations.migration_manager import Migration
+
+
+class DropDuplicateIndexes(Migration):
+    version = 3
+    description = "Drop duplicate bookings indexes (date_time, user)"
+
+    # idx_bookings_date_time дублирует idx_bookings_date (date, time),
+    # idx_bookings_user (user_id) - префикс idx_user_active_bookings
+    sql_script = """
+        DROP INDEX IF EXISTS idx_bookings_date_time;
+        DROP INDEX IF EXISTS idx_bookings_user;
+    """
+
+    async def upgrade(self, db):
+        await db.executescript(self.sql_script)
+
+    async def downgrade(self, db):
+        # Индексы не восстанавливаются: схема v001 их не создаёт, а откат
+        # v002 пересоздаёт bookings только с индексами этой схемы
+        pass
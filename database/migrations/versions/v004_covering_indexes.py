@@ -0,0 +1,39 @@
+"""Покрывающие индексы под реальные запросы"""
+
+from database.migrations.migration_manager import Migration
+
+
+class CoveringIndexes(Migration):
+    version = 4
+    description = "Covering indexes for user bookings, client stats and ratings"
+
+    # - idx_bookings_user_cov: get_user_bookings/can_user_book читают
+    #   только индекс (id - это rowid, он хранится в индексе неявно)
+    # - idx_analytics_user_event_ts: COUNT по событиям и последняя запись
+    #   (ORDER BY timestamp DESC LIMIT 1) в get_client_stats
+    # - idx_feedback_user_rating: AVG(rating) по пользователю без таблицы
+    # Заменяемые индексы - префиксы новых
+    sql_script = """
+        CREATE INDEX IF NOT EXISTS idx_bookings_user_cov
+            ON bookings(user_id, date, time, username, created_at);
+        CREATE INDEX IF NOT EXISTS idx_analytics_user_event_ts
+            ON analytics(user_id, event, timestamp DESC, data);
+        CREATE INDEX IF NOT EXISTS idx_feedback_user_rating
+            ON feedback(user_id, rating);
+        DROP INDEX IF EXISTS idx_analytics_user;
+        DROP INDEX IF EXISTS idx_feedback_user;
+    """
+
+    downgrade_script = """
+        CREATE INDEX IF NOT EXISTS idx_analytics_user ON analytics(user_id, event);
+        CREATE INDEX IF NOT EXISTS idx_feedback_user ON feedback(user_id);
+        DROP INDEX IF EXISTS idx_bookings_user_cov;
+        DROP INDEX IF EXISTS idx_analytics_user_event_ts;
+        DROP INDEX IF EXISTS idx_feedback_user_rating;
+    """
+
+    async def upgrade(self, db):
+        await db.executescript(self.sql_script)
+
+    async def downgrade(self, db):
+        await db.executescript(self.downgrade_script)
@@ -0,0 +1,31 @@
+"""Удаление индексов, дублирующих ограничения UNIQUE(date, time)"""
+
+from database.migrations.migration_manager import Migration
+
+
+class DropRedundantSlotIndexes(Migration):
+    version = 5
+    description = "Drop slot indexes duplicated by UNIQUE(date, time) and covering index"
+
+    # UNIQUE(date, time) в bookings и blocked_slots уже строит автоиндекс
+    # sqlite_autoindex_*_1 по (date, time). Уникальность (user_id, date, time)
+    # следует из UNIQUE(date, time), а чтение по user_id обслуживает
+    # idx_bookings_user_cov (v004)
+    sql_script = """
+        DROP INDEX IF EXISTS idx_bookings_date;
+        DROP INDEX IF EXISTS idx_blocked_date;
+        DROP INDEX IF EXISTS idx_user_active_bookings;
+    """
+
+    downgrade_script = """
+        CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings(date, time);
+        CREATE INDEX IF NOT EXISTS idx_blocked_date ON blocked_slots(date, time);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_user_active_bookings
+            ON bookings(user_id, date, time);
+    """
+
+    async def upgrade(self, db):
+        await db.executescript(self.sql_script)
+
+    async def downgrade(self, db):
+        await db.executescript(self.downgrade_script)
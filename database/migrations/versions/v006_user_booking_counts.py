@@ -0,0 +1,38 @@
+"""Счетчик записей по пользователям для топа клиентов"""
+
+from database.migrations.migration_manager import Migration
+
+
+class AddUserBookingCounts(Migration):
+    version = 6
+    description = "Add user_booking_counts table maintained by trigger"
+
+    # Топ клиентов читает таблицу размером с число пользователей вместо
+    # GROUP BY по всей истории analytics. Счетчик ведет триггер на вставку
+    # в bookings; существующие данные переносятся из событий booking_created
+    sql_script = """
+        CREATE TABLE IF NOT EXISTS user_booking_counts
+            (user_id INTEGER PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0);
+        CREATE INDEX IF NOT EXISTS idx_ubc_n ON user_booking_counts(n DESC);
+
+        CREATE TRIGGER IF NOT EXISTS trg_booking_count AFTER INSERT ON bookings
+        BEGIN
+            INSERT INTO user_booking_counts (user_id, n) VALUES (NEW.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET n = n + 1;
+        END;
+
+        INSERT OR REPLACE INTO user_booking_counts (user_id, n)
+            SELECT user_id, COUNT(*) FROM analytics
+            WHERE event='booking_created' GROUP BY user_id;
+    """
+
+    downgrade_script = """
+        DROP TRIGGER IF EXISTS trg_booking_count;
+        DROP TABLE IF EXISTS user_booking_counts;
+    """
+
+    async def upgrade(self, db):
+        await db.executescript(self.sql_script)
+
+    async def downgrade(self, db):
+        await db.executescript(self.downgrade_script)
@@ -0,0 +1,42 @@
+"""Счетчик пользователей для дашборда"""
+
+from database.migrations.migration_manager import Migration
+
+
+class AddAppStats(Migration):
+    version = 7
+    description = "Add app_stats row with total_users maintained by triggers"
+
+    # Общее число пользователей читается из одной строки вместо COUNT(*)
+    # по всей таблице users. Счетчик ведут триггеры на вставку и удаление
+    # в той же транзакции; начальное значение - текущий COUNT(*)
+    sql_script = """
+        CREATE TABLE IF NOT EXISTS app_stats
+            (id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_users INTEGER NOT NULL DEFAULT 0);
+
+        INSERT OR IGNORE INTO app_stats (id, total_users)
+            SELECT 1, COUNT(*) FROM users;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_count_ins AFTER INSERT ON users
+        BEGIN
+            UPDATE app_stats SET total_users = total_users + 1 WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_users_count_del AFTER DELETE ON users
+        BEGIN
+            UPDATE app_stats SET total_users = total_users - 1 WHERE id = 1;
+        END;
+    """
+
+    downgrade_script = """
+        DROP TRIGGER IF EXISTS trg_users_count_ins;
+        DROP TRIGGER IF EXISTS trg_users_count_del;
+        DROP TABLE IF EXISTS app_stats;
+    """
+
+    async def upgrade(self, db):
+        await db.executescript(self.sql_script)
+
+    async def downgrade(self, db):
+        await db.executescript(self.downgrade_script)
@@ -1,10 +1,10 @@
-"""Модели данных"""
+"""Модели данных (неизменяемые, со __slots__)"""
 
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Booking:
     """Модель записи"""
 
@@ -16,7 +16,7 @@ class Booking:
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class User:
     """Модель пользователя"""
 
@@ -24,7 +24,7 @@ class User:
     first_seen: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BlockedSlot:
     """Модель заблокированного слота"""
 
@@ -36,7 +36,7 @@ class BlockedSlot:
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ClientStats:
     """Статистика клиента"""
 
@@ -0,0 +1,230 @@
+"""Пул соединений SQLite: один писатель и N читателей (WAL)"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+import aiosqlite
+
+# PRAGMA для долгоживущих соединений (применяются один раз при открытии).
+# page_size действует только на ещё пустой БД (до первой таблицы и до
+# перехода в WAL) - для существующей базы нужен VACUUM в режиме DELETE.
+# mmap_size: чтение страниц напрямую из отображённого файла, без read().
+# analysis_limit: ANALYZE (и PRAGMA optimize) читает выборку ~1000 строк
+# на индекс, а не всю таблицу - статистику можно обновлять в любой момент.
+CONNECTION_PRAGMAS = """
+    PRAGMA page_size=8192;
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA wal_autocheckpoint=1000;
+    PRAGMA busy_timeout=5000;
+    PRAGMA foreign_keys=ON;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-131072;
+    PRAGMA mmap_size=268435456;
+    PRAGMA analysis_limit=1000;
+"""
+
+READER_PRAGMAS = """
+    PRAGMA query_only=1;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-16000;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Для соединений с явными транзакциями (BookingService).
+# synchronous и busy_timeout действуют на соединение, а не на файл БД:
+# без них коммит такого соединения идёт с synchronous=FULL
+TRANSACTION_PRAGMAS = """
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+"""
+
+DEFAULT_READERS = 4
+
+# Долгоживущие соединения для BEGIN IMMEDIATE: запись в SQLite всё равно
+# сериализуется, второе нужно лишь чтобы не ждать освобождения первого
+TRANSACTION_CONNECTIONS = 2
+
+# Период фонового PRAGMA optimize для долгоживущего процесса (секунды)
+OPTIMIZE_INTERVAL = 6 * 3600
+
+# Размер кэша скомпилированных выражений sqlite3 (по умолчанию 128)
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """
+    Пул соединений для WAL-режима SQLite.
+
+    Писатель один (запись в SQLite всё равно сериализуется), читатели
+    открыты только на чтение и выдаются из FIFO-очереди, поэтому SELECT
+    из разных корутин выполняются параллельно в потоках aiosqlite.
+    Явные транзакции идут через отдельные соединения (acquire_transactional),
+    чтобы BEGIN IMMEDIATE не держал блокировку писателя пула.
+    """
+
+    def __init__(self, db_path: str, readers: int = DEFAULT_READERS):
+        self.db_path = db_path
+        self.readers_count = readers
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._readers: asyncio.Queue = asyncio.Queue(maxsize=readers)
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._tx: asyncio.Queue = asyncio.Queue(maxsize=TRANSACTION_CONNECTIONS)
+        self._all_tx: List[aiosqlite.Connection] = []
+        self._optimizer: Optional[asyncio.Task] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    async def open(self):
+        """Открыть писателя и читателей"""
+        # Писатель первым: создаёт файл БД и включает WAL,
+        # без которого читатели mode=ro не откроются
+        self._writer = await aiosqlite.connect(
+            self.db_path, isolation_level=None, cached_statements=CACHED_STATEMENTS
+        )
+        await self._writer.executescript(CONNECTION_PRAGMAS)
+        # Репозитории читают строки по позиции - обычные кортежи без обёртки Row
+        self._writer.row_factory = None
+
+        for _ in range(self.readers_count):
+            reader = await aiosqlite.connect(
+                f"file:{self.db_path}?mode=ro",
+                uri=True,
+                isolation_level=None,
+                cached_statements=CACHED_STATEMENTS,
+            )
+            await reader.executescript(READER_PRAGMAS)
+            reader.row_factory = None
+            self._all_readers.append(reader)
+            self._readers.put_nowait(reader)
+
+        for _ in range(TRANSACTION_CONNECTIONS):
+            tx = await aiosqlite.connect(
+                self.db_path, cached_statements=CACHED_STATEMENTS
+            )
+            await tx.executescript(TRANSACTION_PRAGMAS)
+            self._all_tx.append(tx)
+            self._tx.put_nowait(tx)
+
+        logging.info(
+            "Connection pool opened: 1 writer, %d readers, %d transactional",
+            self.readers_count,
+            TRANSACTION_CONNECTIONS,
+        )
+
+    async def optimize(self, mask: Optional[int] = None):
+        """PRAGMA optimize на писателе (mask - битовая маска SQLite)
+
+        Без маски - no-op, если статистика планировщика свежая.
+        0x10002 на новой БД сразу строит sqlite_stat1 по всем таблицам.
+        """
+        sql = "PRAGMA optimize" if mask is None else f"PRAGMA optimize={mask:#x}"
+        async with self.acquire_write() as db:
+            await db.execute(sql)
+
+    def start_optimizer(self, interval: float = OPTIMIZE_INTERVAL):
+        """Запустить периодический PRAGMA optimize"""
+        if self._optimizer is None:
+            self._optimizer = asyncio.create_task(self._optimize_loop(interval))
+
+    def schedule_optimize(self, mask: int = 0x10002):
+        """Разово обновить статистику в фоне (после массовых записей)
+
+        Пока предыдущий запуск не завершился, новый не ставится.
+        """
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._refresh_stats(mask))
+
+    async def _refresh_stats(self, mask: int):
+        try:
+            await self.optimize(mask)
+        except Exception as e:
+            logging.warning("PRAGMA optimize after bulk write failed: %s", e)
+
+    async def _optimize_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.optimize()
+            except Exception as e:
+                logging.warning("Periodic PRAGMA optimize failed: %s", e)
+
+    async def close(self):
+        """Закрыть все соединения пула"""
+        for task in (self._optimizer, self._refresh):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._optimizer = None
+        self._refresh = None
+
+        for conn in self._all_readers + self._all_tx:
+            await conn.close()
+        self._all_readers.clear()
+        self._all_tx.clear()
+        self._readers = asyncio.Queue(maxsize=self.readers_count)
+        self._tx = asyncio.Queue(maxsize=TRANSACTION_CONNECTIONS)
+
+        if self._writer is not None:
+            # Обновить статистику планировщика для таблиц, где она устарела
+            # (рекомендуется выполнять перед закрытием долгоживущего соединения)
+            try:
+                await self._writer.execute("PRAGMA optimize")
+            except Exception as e:
+                logging.warning("PRAGMA optimize failed: %s", e)
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def acquire_read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Взять соединение только для чтения (ждёт свободного читателя)"""
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def acquire_snapshot(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Читатель внутри BEGIN DEFERRED
+
+        Читатели работают в автокоммите: каждый запрос видит свой снимок WAL.
+        В этом блоке все запросы видят один снимок - для отчётов из
+        нескольких SELECT, которые должны быть согласованы между собой.
+        """
+        async with self.acquire_read() as reader:
+            await reader.execute("BEGIN DEFERRED")
+            try:
+                yield reader
+            finally:
+                await reader.rollback()
+
+    @asynccontextmanager
+    async def acquire_write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Взять соединение-писатель (эксклюзивно на время блока)"""
+        async with self._writer_lock:
+            yield self._writer
+
+    @asynccontextmanager
+    async def acquire_transactional(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Взять соединение для явной транзакции (BEGIN IMMEDIATE ... COMMIT)
+
+        Незавершённая транзакция откатывается перед возвратом соединения.
+        """
+        conn = await self._tx.get()
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+            finally:
+                self._tx.put_nowait(conn)
@@ -1,11 +1,8 @@
 """Фасад для работы с базой данных через репозитории"""
 
-import logging
-from typing import Dict, List, Optional, Set, Tuple
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
 
-import aiosqlite
-
-from config import DATABASE_PATH
+from database.base_repository import BaseRepository
 from database.repositories import (
     AnalyticsRepository,
     BookingRepository,
@@ -26,90 +23,31 @@ class Database:
     # === ИНИЦИАЛИЗАЦИЯ ===
 
     @staticmethod
-    async def init_db():
-        """Инициализация БД с таблицами и индексами"""
-        async with aiosqlite.connect(DATABASE_PATH) as db:
-            # Таблицы
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS bookings
-                (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT, time TEXT, user_id INTEGER, username TEXT,
-                created_at TEXT, UNIQUE(date, time))"""
-            )
-
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS users
-                (user_id INTEGER PRIMARY KEY, first_seen TEXT)"""
-            )
-
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS analytics
-                (user_id INTEGER, event TEXT, data TEXT, timestamp TEXT)"""
-            )
-
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS feedback
-                (user_id INTEGER, booking_id INTEGER, rating INTEGER, timestamp TEXT)"""
-            )
-
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS blocked_slots
-                (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT NOT NULL,
-                time TEXT NOT NULL,
-                reason TEXT,
-                blocked_by INTEGER NOT NULL,
-                blocked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(date, time))"""
-            )
-
-            await db.execute(
-                """CREATE TABLE IF NOT EXISTS admin_sessions
-                (user_id INTEGER PRIMARY KEY, message_id INTEGER, updated_at TEXT)"""
-            )
-
-            # Индексы для производительности
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_bookings_date
-                ON bookings(date, time)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_bookings_user
-                ON bookings(user_id)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_analytics_user
-                ON analytics(user_id, event)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_blocked_date
-                ON blocked_slots(date, time)"""
-            )
-            await db.execute(
-                """CREATE UNIQUE INDEX IF NOT EXISTS idx_user_active_bookings
-                ON bookings(user_id, date, time)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_analytics_timestamp
-                ON analytics(timestamp)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_feedback_timestamp
-                ON feedback(timestamp)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_feedback_user
-                ON feedback(user_id)"""
-            )
-            await db.execute(
-                """CREATE INDEX IF NOT EXISTS idx_bookings_date_time
-                ON bookings(date, time)"""
-            )
-
-            await db.commit()
-            logging.info(
-                "Database initialized with indexes and race condition protection"
-            )
+    async def start():
+        """
+        Пул соединений, статистика планировщика и фоновые задачи.
+
+        Схема (таблицы, индексы, триггеры) - забота миграций
+        (MigrationManager), здесь DDL не выполняется.
+        """
+        # Статистика планировщика сразу (в том числе на пустой БД)
+        # и её периодическое обновление
+        pool = await BaseRepository.get_pool()
+        await pool.optimize(0x10002)
+        pool.start_optimizer()
+
+        AnalyticsRepository.start_flusher()
+
+    @staticmethod
+    async def close():
+        """Дописать очередь аналитики и закрыть пул соединений с БД"""
+        await AnalyticsRepository.stop_flusher()
+        await BaseRepository.close_pool()
+
+    @staticmethod
+    async def schedule_optimize():
+        """Фоновое обновление статистики планировщика после массовых изменений"""
+        await BaseRepository.schedule_optimize()
 
     # === БРОНИРОВАНИЯ (делегирование в BookingRepository) ===
 
@@ -118,7 +56,7 @@ class Database:
         return await BookingRepository.is_slot_free(date_str, time_str)
 
     @staticmethod
-    async def get_occupied_slots_for_day(date_str: str) -> Set[str]:
+    async def get_occupied_slots_for_day(date_str: str) -> FrozenSet[str]:
         return await BookingRepository.get_occupied_slots_for_day(date_str)
 
     @staticmethod
@@ -155,11 +93,35 @@ class Database:
     async def get_week_schedule(start_date: str, days: int = 7) -> List[Tuple]:
         return await BookingRepository.get_week_schedule(start_date, days)
 
+    @staticmethod
+    def iter_bookings(start_date: str, days: int) -> AsyncIterator[Tuple[str, str, str]]:
+        return BookingRepository.iter_bookings(start_date, days)
+
     @staticmethod
     async def block_slot(
-        date_str: str, time_str: str, admin_id: int, reason: str = None
+        date_str: str,
+        time_str: str,
+        admin_id: int,
+        reason: str = None,
+        *,
+        timestamp: Optional[str] = None,
     ) -> bool:
-        return await BookingRepository.block_slot(date_str, time_str, admin_id, reason)
+        return await BookingRepository.block_slot(
+            date_str, time_str, admin_id, reason, timestamp=timestamp
+        )
+
+    @staticmethod
+    async def block_slots_bulk(
+        date_str: str,
+        times: List[str],
+        admin_id: int,
+        reason: str = None,
+        *,
+        timestamp: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        return await BookingRepository.block_slots_bulk(
+            date_str, times, admin_id, reason, timestamp=timestamp
+        )
 
     @staticmethod
     async def unblock_slot(date_str: str, time_str: str) -> bool:
@@ -177,31 +139,22 @@ class Database:
 
     @staticmethod
     async def get_day_status(date_str: str) -> str:
-        """Статус загрузки дня (🟢🟡🔴)"""
-        # Оставляем здесь, так как используется редко
-        occupied = await BookingRepository.get_occupied_slots_for_day(date_str)
-        from config import WORK_HOURS_END, WORK_HOURS_START
-
-        total_slots = WORK_HOURS_END - WORK_HOURS_START
-        total_occupied = len(occupied)
-
-        if total_occupied == 0:
-            return "🟢"
-        elif total_occupied < total_slots:
-            return "🟡"
-        else:
-            return "🔴"
+        return await BookingRepository.get_day_status(date_str)
 
     # === ПОЛЬЗОВАТЕЛИ (делегирование в UserRepository) ===
 
     @staticmethod
-    async def is_new_user(user_id: int) -> bool:
-        return await UserRepository.is_new_user(user_id)
+    async def is_new_user(user_id: int, *, timestamp: Optional[str] = None) -> bool:
+        return await UserRepository.is_new_user(user_id, timestamp=timestamp)
 
     @staticmethod
     async def get_all_users() -> List[int]:
         return await UserRepository.get_all_users()
 
+    @staticmethod
+    def iter_all_users() -> AsyncIterator[int]:
+        return UserRepository.iter_all_users()
+
     @staticmethod
     async def get_total_users_count() -> int:
         return await UserRepository.get_total_users_count()
@@ -213,16 +166,26 @@ class Database:
     # === АНАЛИТИКА И ОТЗЫВЫ (делегирование в AnalyticsRepository) ===
 
     @staticmethod
-    async def log_event(user_id: int, event: str, data: str = ""):
-        await AnalyticsRepository.log_event(user_id, event, data)
+    async def log_event(
+        user_id: int, event: str, data: str = "", *, timestamp: Optional[str] = None
+    ):
+        await AnalyticsRepository.log_event(user_id, event, data, timestamp=timestamp)
 
     @staticmethod
     async def get_client_stats(user_id: int) -> ClientStats:
         return await AnalyticsRepository.get_client_stats(user_id)
 
     @staticmethod
-    async def save_feedback(user_id: int, booking_id: int, rating: int) -> bool:
-        return await AnalyticsRepository.save_feedback(user_id, booking_id, rating)
+    async def save_feedback(
+        user_id: int, booking_id: int, rating: int, *, timestamp: Optional[str] = None
+    ) -> bool:
+        return await AnalyticsRepository.save_feedback(
+            user_id, booking_id, rating, timestamp=timestamp
+        )
+
+    @staticmethod
+    async def cleanup_old_analytics(before_timestamp: str) -> Tuple[int, int]:
+        return await AnalyticsRepository.cleanup_old_analytics(before_timestamp)
 
     @staticmethod
     async def get_top_clients(limit: int = 10) -> List[Tuple]:
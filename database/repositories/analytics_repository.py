@@ -1,17 +1,27 @@
 """Репозиторий для работы с аналитикой и отзывами"""
 
+import asyncio
 import logging
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
 import aiosqlite
 
-from config import DATABASE_PATH
 from database.base_repository import BaseRepository
+from database.cache import Uncached, result_cache
 from utils.helpers import now_local
 
+# Пакетная запись аналитики: до ANALYTICS_BATCH_SIZE событий или не дольше
+# ANALYTICS_FLUSH_INTERVAL секунд на одну транзакцию
+ANALYTICS_BATCH_SIZE = 100
+ANALYTICS_FLUSH_INTERVAL = 0.5
+ANALYTICS_QUEUE_SIZE = 10000
 
-@dataclass
+# События, от которых зависит ClientStats (сбрасывают кэш cs:USER_ID)
+_STATS_EVENTS = frozenset({"booking_created", "booking_cancelled"})
+
+
+@dataclass(slots=True, frozen=True)
 class ClientStats:
     """Статистика клиента"""
 
@@ -21,77 +31,157 @@ class ClientStats:
     last_booking: Optional[str]
 
 
+# Статистика без записей (запасное значение при ошибке БД)
+_EMPTY_CLIENT_STATS = ClientStats(
+    total_bookings=0, cancelled_bookings=0, avg_rating=0.0, last_booking=None
+)
+
+
 class AnalyticsRepository(BaseRepository):
     """Репозиторий для аналитики и отзывов"""
 
+    # Очередь событий и фоновая задача записи (см. start_flusher)
+    _queue: Optional[asyncio.Queue] = None
+    _flusher: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def start_flusher():
+        """Запустить фоновую пакетную запись событий"""
+        if AnalyticsRepository._flusher is None:
+            AnalyticsRepository._queue = asyncio.Queue(maxsize=ANALYTICS_QUEUE_SIZE)
+            AnalyticsRepository._flusher = asyncio.create_task(
+                AnalyticsRepository._flush_loop(AnalyticsRepository._queue)
+            )
+
     @staticmethod
-    async def log_event(user_id: int, event: str, data: str = ""):
-        """Логирование события"""
+    async def stop_flusher():
+        """Остановить запись, дописав события из очереди"""
+        queue, task = AnalyticsRepository._queue, AnalyticsRepository._flusher
+        if task is None:
+            return
+
+        AnalyticsRepository._queue = None
+        AnalyticsRepository._flusher = None
+        # None - маркер остановки: всё, что было в очереди до него, будет записано
+        await queue.put(None)
+        await task
+
+    @staticmethod
+    async def _flush_loop(queue: asyncio.Queue):
+        """Собирать события в пачки и писать одной транзакцией"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            deadline = loop.time() + ANALYTICS_FLUSH_INTERVAL
+            while len(batch) < ANALYTICS_BATCH_SIZE:
+                # Уже накопленные события забираем без ожидания: wait_for
+                # создаёт задачу и таймер на каждый вызов
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            # Одна метка времени на пачку вместо now_local() на каждое событие
+            now = now_local().isoformat()
+            await AnalyticsRepository._execute_many(
+                AnalyticsRepository._stmts["log_event"],
+                [
+                    (user_id, event, data, timestamp or now)
+                    for user_id, event, data, timestamp in batch
+                ],
+            )
+            for user_id, event, _, _ in batch:
+                if event in _STATS_EVENTS:
+                    result_cache.invalidate_user(user_id)
+            if stop:
+                return
+
+    @staticmethod
+    async def log_event(
+        user_id: int, event: str, data: str = "", *, timestamp: Optional[str] = None
+    ):
+        """Логирование события (через очередь, если запущена запись)
+
+        Без timestamp событие в очереди получает общую метку времени
+        своей пачки при записи.
+        """
+        queue = AnalyticsRepository._queue
+        if queue is not None:
+            try:
+                queue.put_nowait((user_id, event, data, timestamp))
+                return
+            except asyncio.QueueFull:
+                logging.warning("Analytics queue is full, writing event directly")
+
         try:
-            await AnalyticsRepository._execute_query(
-                "INSERT INTO analytics (user_id, event, data, timestamp) VALUES (?, ?, ?, ?)",
-                (user_id, event, data, now_local().isoformat()),
+            await AnalyticsRepository.prepared(
+                "log_event",
+                (user_id, event, data, timestamp or now_local().isoformat()),
                 commit=True,
             )
+            if event in _STATS_EVENTS:
+                result_cache.invalidate_user(user_id)
         except Exception as e:
             # Не падаем, только логируем
             logging.error(f"Failed to log event {event} for user {user_id}: {e}")
 
     @staticmethod
+    @result_cache.cached(lambda user_id: f"cs:{user_id}")
     async def get_client_stats(user_id: int) -> ClientStats:
         """Статистика клиента"""
         try:
-            # Всего записей
-            total = await AnalyticsRepository._count(
-                "analytics", "user_id=? AND event='booking_created'", (user_id,)
-            )
-
-            # Отмен
-            cancelled = await AnalyticsRepository._count(
-                "analytics", "user_id=? AND event='booking_cancelled'", (user_id,)
-            )
-
-            # Средний рейтинг
-            avg_result = await AnalyticsRepository._execute_query(
-                "SELECT AVG(rating) FROM feedback WHERE user_id=?",
-                (user_id,),
-                fetch_one=True,
-            )
-            avg_rating = avg_result[0] if avg_result and avg_result[0] else 0.0
-
-            # Последняя запись
-            last_result = await AnalyticsRepository._execute_query(
-                "SELECT data FROM analytics WHERE user_id=? AND event='booking_created' "
-                "ORDER BY timestamp DESC LIMIT 1",
-                (user_id,),
+            # Счётчики, средний рейтинг и последняя запись - одним запросом,
+            # значения по умолчанию подставляет SQLite. event IN (...) - поиск
+            # по индексу (user_id, event, timestamp) только двух нужных событий
+            row = await AnalyticsRepository._execute_query(
+                """SELECT
+                    COALESCE(SUM(event='booking_created'), 0),
+                    COALESCE(SUM(event='booking_cancelled'), 0),
+                    COALESCE((SELECT AVG(rating) FROM feedback WHERE user_id=:uid), 0.0),
+                    (SELECT data FROM analytics WHERE user_id=:uid AND event='booking_created'
+                     ORDER BY timestamp DESC LIMIT 1)
+                FROM analytics WHERE user_id=:uid
+                    AND event IN ('booking_created', 'booking_cancelled')""",
+                {"uid": user_id},
                 fetch_one=True,
             )
-            last_booking = last_result[0] if last_result else None
-
-            return ClientStats(
-                total_bookings=total,
-                cancelled_bookings=cancelled,
-                avg_rating=avg_rating,
-                last_booking=last_booking,
-            )
+            if row is None:  # ошибка БД (залогирована) - не кэшировать
+                return Uncached(_EMPTY_CLIENT_STATS)
+            return ClientStats(*row)
         except Exception as e:
             logging.error(f"Error getting client stats for {user_id}: {e}")
-            return ClientStats(
-                total_bookings=0, cancelled_bookings=0, avg_rating=0.0, last_booking=None
-            )
+            return Uncached(_EMPTY_CLIENT_STATS)
 
     @staticmethod
-    async def save_feedback(user_id: int, booking_id: int, rating: int) -> bool:
+    async def save_feedback(
+        user_id: int, booking_id: int, rating: int, *, timestamp: Optional[str] = None
+    ) -> bool:
         """Сохранить отзыв"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with AnalyticsRepository.acquire_write() as db:
                 await db.execute(
                     "INSERT INTO feedback (user_id, booking_id, rating, timestamp) "
                     "VALUES (?, ?, ?, ?)",
-                    (user_id, booking_id, rating, now_local().isoformat()),
+                    (user_id, booking_id, rating, timestamp or now_local().isoformat()),
                 )
                 await db.commit()
-            return True
+                result_cache.invalidate_user(user_id)
+                return True
         except aiosqlite.IntegrityError as e:
             logging.warning(f"Feedback already exists for booking {booking_id}: {e}")
             return False
@@ -99,15 +189,39 @@ class AnalyticsRepository(BaseRepository):
             logging.error(f"Database error in save_feedback: {e}")
             return False
 
+    @staticmethod
+    async def cleanup_old_analytics(before_timestamp: str) -> Tuple[int, int]:
+        """Удалить события и отзывы старше before_timestamp (ISO)
+
+        Returns:
+            (удалено событий, удалено отзывов)
+        """
+        try:
+            events = await AnalyticsRepository._delete_in_chunks(
+                "analytics", "timestamp < ?", (before_timestamp,)
+            )
+            feedback = await AnalyticsRepository._delete_in_chunks(
+                "feedback", "timestamp < ?", (before_timestamp,)
+            )
+            if events or feedback:
+                # Затронутые пользователи неизвестны - сбрасываем кэш целиком
+                result_cache.clear()
+                await AnalyticsRepository.schedule_optimize()
+            logging.info(
+                f"Cleaned up {events} analytics events and {feedback} feedback rows"
+            )
+            return events, feedback
+        except Exception as e:
+            logging.error(f"Error cleaning up old analytics: {e}")
+            return 0, 0
+
     @staticmethod
     async def get_top_clients(limit: int = 10) -> List[Tuple]:
-        """Топ клиентов по количеству записей"""
+        """Топ клиентов по количеству записей (счетчик user_booking_counts)"""
         try:
             return (
                 await AnalyticsRepository._execute_query(
-                    """SELECT user_id, COUNT(*) as total FROM analytics
-                    WHERE event='booking_created'
-                    GROUP BY user_id ORDER BY total DESC LIMIT ?""",
+                    "SELECT user_id, n FROM user_booking_counts ORDER BY n DESC LIMIT ?",
                     (limit,),
                     fetch_all=True,
                 )
@@ -3,21 +3,43 @@
 import calendar
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
+from functools import lru_cache
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
 
 import aiosqlite
 
 from config import (
     CANCELLATION_HOURS,
-    DATABASE_PATH,
     MAX_BOOKINGS_PER_USER,
     TIMEZONE,
     WORK_HOURS_END,
     WORK_HOURS_START,
 )
 from database.base_repository import BaseRepository
+from database.cache import Uncached, result_cache
 from utils.helpers import now_local
 
+# Слотов в рабочем дне и статусы загрузки: свободно / частично / занято
+_TOTAL_SLOTS = WORK_HOURS_END - WORK_HOURS_START
+_STATUS = ("🟢", "🟡", "🔴")
+
+# Размер страницы при обходе записей (экспорт)
+BOOKINGS_CHUNK_SIZE = 1000
+
+# Будущие записи: ?1 - user_id, ?2 - сегодняшняя дата, ?3 - текущее время
+_FUTURE_FILTER = "user_id=?1 AND date >= ?2 AND (date > ?2 OR time >= ?3)"
+_USER_BOOKINGS_SQL = (
+    "SELECT id, date, time, username, created_at FROM bookings "
+    f"WHERE {_FUTURE_FILTER} ORDER BY date, time"
+)
+
+
+@lru_cache(maxsize=256)
+def _month_range(year: int, month: int) -> Tuple[str, str]:
+    """Первый и последний день месяца в ISO (YYYY-MM-DD)"""
+    last = calendar.monthrange(year, month)[1]
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{last:02d}"
+
 
 class BookingRepository(BaseRepository):
     """Репозиторий для управления бронированиями"""
@@ -26,118 +48,115 @@ class BookingRepository(BaseRepository):
     async def is_slot_free(date_str: str, time_str: str) -> bool:
         """Проверить свободен ли слот (включая блокировки)"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
-                # Проверяем бронирование
-                booking_exists = await BookingRepository._exists(
-                    "bookings", "date=? AND time=?", (date_str, time_str)
-                )
-                # Проверяем блокировку
-                async with db.execute(
-                    "SELECT 1 FROM blocked_slots WHERE date=? AND time=?",
-                    (date_str, time_str),
-                ) as cursor:
-                    blocked_exists = await cursor.fetchone() is not None
-
-                return not booking_exists and not blocked_exists
+            # Бронирование и блокировка - одним запросом к читателю
+            result = await BookingRepository.prepared(
+                "slot_taken", (date_str, time_str), fetch_one=True
+            )
+            return result is not None and not result[0]
         except Exception as e:
             logging.error(f"Error checking slot {date_str} {time_str}: {e}")
             return False
 
     @staticmethod
-    async def get_occupied_slots_for_day(date_str: str) -> Set[str]:
-        """Получить все занятые слоты за день"""
-        occupied = set()
+    @result_cache.cached(lambda date_str: f"os:{date_str}")
+    async def get_occupied_slots_for_day(date_str: str) -> FrozenSet[str]:
+        """Получить все занятые слоты за день (неизменяемое множество - кэшируется)"""
         try:
-            # Забронированные
-            bookings = await BookingRepository._execute_query(
-                "SELECT time FROM bookings WHERE date=?", (date_str,), fetch_all=True
-            )
-            if bookings:
-                occupied.update(time for (time,) in bookings)
-
-            # Заблокированные
-            blocked = await BookingRepository._execute_query(
-                "SELECT time FROM blocked_slots WHERE date=?", (date_str,), fetch_all=True
+            # Забронированные и заблокированные - одним запросом
+            rows = await BookingRepository._execute_query(
+                """SELECT time FROM bookings WHERE date=?1
+                UNION ALL
+                SELECT time FROM blocked_slots WHERE date=?1""",
+                (date_str,),
+                fetch_all=True,
             )
-            if blocked:
-                occupied.update(time for (time,) in blocked)
+            if rows is None:  # ошибка БД (залогирована) - не кэшировать
+                return Uncached(frozenset())
+            # Один проход по строкам без промежуточного списка
+            return frozenset(t for (t,) in rows)
         except Exception as e:
             logging.error(f"Error getting occupied slots for {date_str}: {e}")
-
-        return occupied
+            return Uncached(frozenset())
 
     @staticmethod
+    @result_cache.cached(lambda year, month: f"ms:{year:04d}-{month:02d}")
     async def get_month_statuses(year: int, month: int) -> Dict[str, str]:
         """Получить статусы всех дней месяца"""
         try:
-            first_day = datetime(year, month, 1).date()
-            last_day_num = calendar.monthrange(year, month)[1]
-            last_day = datetime(year, month, last_day_num).date()
-
-            statuses = {}
-            total_slots = WORK_HOURS_END - WORK_HOURS_START
+            first_iso, last_iso = _month_range(year, month)
 
-            # Объединенный запрос UNION ALL
+            # Записи и блокировки одним UNION ALL, статус дня считает SQLite:
+            # строки сразу пары (дата, эмодзи). В выборке только дни
+            # хотя бы с одним занятым слотом - остальные 🟢
             rows = await BookingRepository._execute_query(
-                """SELECT date, SUM(cnt) as total_count FROM (
+                """SELECT date,
+                    CASE WHEN SUM(cnt) >= ?3 THEN ?5 ELSE ?4 END
+                FROM (
                     SELECT date, COUNT(*) as cnt FROM bookings
-                    WHERE date >= ? AND date <= ? GROUP BY date
+                    WHERE date BETWEEN ?1 AND ?2 GROUP BY date
                     UNION ALL
                     SELECT date, COUNT(*) as cnt FROM blocked_slots
-                    WHERE date >= ? AND date <= ? GROUP BY date
+                    WHERE date BETWEEN ?1 AND ?2 GROUP BY date
                 ) GROUP BY date""",
-                (
-                    first_day.isoformat(),
-                    last_day.isoformat(),
-                    first_day.isoformat(),
-                    last_day.isoformat(),
-                ),
+                (first_iso, last_iso, _TOTAL_SLOTS, _STATUS[1], _STATUS[2]),
                 fetch_all=True,
             )
+            if rows is None:  # ошибка БД (залогирована) - не кэшировать
+                return Uncached({})
+            return dict(rows)
+        except Exception as e:
+            logging.error(f"Error getting month statuses for {year}-{month}: {e}")
+            return Uncached({})
 
-            if rows:
-                for date_str, total_count in rows:
-                    if total_count == 0:
-                        statuses[date_str] = "🟢"
-                    elif total_count < total_slots:
-                        statuses[date_str] = "🟡"
-                    else:
-                        statuses[date_str] = "🔴"
+    @staticmethod
+    @result_cache.cached(lambda date_str: f"ds:{date_str}")
+    async def get_day_status(date_str: str) -> str:
+        """Статус загрузки дня (🟢🟡🔴)"""
+        # Месяц уже в кэше после отрисовки календаря - ответ без запроса
+        found, month_statuses = result_cache.get(f"ms:{date_str[:7]}")
+        if found:
+            return month_statuses.get(date_str, _STATUS[0])
+
+        # Занятые слоты дня уже загружены для клавиатуры времени
+        found, occupied = result_cache.get(f"os:{date_str}")
+        if found:
+            return BookingRepository._load_status(len(occupied))
 
-            return statuses
+        try:
+            # Для трёх состояний точный счёт не нужен: подзапросы
+            # с LIMIT останавливают сканирование на _TOTAL_SLOTS строках
+            row = await BookingRepository._execute_query(
+                """SELECT
+                    (SELECT COUNT(*) FROM (SELECT 1 FROM bookings WHERE date=?1 LIMIT ?2))
+                    + (SELECT COUNT(*) FROM (SELECT 1 FROM blocked_slots WHERE date=?1 LIMIT ?2))""",
+                (date_str, _TOTAL_SLOTS),
+                fetch_one=True,
+            )
+            if row is None:  # ошибка БД (залогирована) - не кэшировать
+                return Uncached(_STATUS[0])
+            return BookingRepository._load_status(row[0])
         except Exception as e:
-            logging.error(f"Error getting month statuses for {year}-{month}: {e}")
-            return {}
+            logging.error(f"Error getting day status for {date_str}: {e}")
+            return Uncached(_STATUS[0])
+
+    @staticmethod
+    def _load_status(occupied: int) -> str:
+        """Эмодзи загрузки по числу занятых слотов"""
+        return _STATUS[(occupied > 0) + (occupied >= _TOTAL_SLOTS)]
 
     @staticmethod
     async def get_user_bookings(user_id: int) -> List[Tuple]:
         """Получить активные (будущие) записи пользователя"""
         try:
+            # ISO-дата и HH:MM сравниваются лексикографически в хронологическом
+            # порядке. Условие без склейки строк: date >= ?2 - диапазон
+            # по индексу (user_id, date, time), а не перебор всех записей
             now = now_local()
-            bookings = await BookingRepository._execute_query(
-                "SELECT id, date, time, username, created_at FROM bookings "
-                "WHERE user_id=? ORDER BY date, time",
-                (user_id,),
+            return await BookingRepository._execute_query(
+                _USER_BOOKINGS_SQL,
+                (user_id, now.strftime("%Y-%m-%d"), now.strftime("%H:%M")),
                 fetch_all=True,
-            )
-
-            if not bookings:
-                return []
-
-            # Фильтруем только будущие
-            future_bookings = []
-            for booking_id, date_str, time_str, username, created_at in bookings:
-                booking_dt_naive = datetime.strptime(
-                    f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
-                )
-                booking_dt = TIMEZONE.localize(booking_dt_naive)
-
-                if booking_dt >= now:
-                    future_bookings.append(
-                        (booking_id, date_str, time_str, username, created_at)
-                    )
-
-            return future_bookings
+            ) or []
         except Exception as e:
             logging.error(f"Error getting bookings for user {user_id}: {e}")
             return []
@@ -146,8 +165,13 @@ class BookingRepository(BaseRepository):
     async def can_user_book(user_id: int) -> Tuple[bool, int]:
         """Проверить лимит записей пользователя"""
         try:
-            bookings = await BookingRepository.get_user_bookings(user_id)
-            count = len(bookings)
+            # Только COUNT(*) по диапазону индекса - строки записей не читаются
+            now = now_local()
+            count = await BookingRepository._count(
+                "bookings",
+                _FUTURE_FILTER,
+                (user_id, now.strftime("%Y-%m-%d"), now.strftime("%H:%M")),
+            )
             return count < MAX_BOOKINGS_PER_USER, count
         except Exception as e:
             logging.error(f"Error checking booking limit for user {user_id}: {e}")
@@ -157,10 +181,10 @@ class BookingRepository(BaseRepository):
     async def can_cancel_booking(date_str: str, time_str: str) -> Tuple[bool, float]:
         """Проверить возможность отмены (>24ч)"""
         try:
-            booking_dt_naive = datetime.strptime(
-                f"{date_str} {time_str}", "%Y-%m-%d %H:%M"
+            # fromisoformat реализован на C и не разбирает строку формата
+            booking_dt = datetime.fromisoformat(f"{date_str}T{time_str}").replace(
+                tzinfo=TIMEZONE
             )
-            booking_dt = TIMEZONE.localize(booking_dt_naive)
             now = now_local()
             hours_until = (booking_dt - now).total_seconds() / 3600
             return hours_until >= CANCELLATION_HOURS, hours_until
@@ -183,7 +207,7 @@ class BookingRepository(BaseRepository):
     async def delete_booking(booking_id: int, user_id: int) -> bool:
         """Удалить запись"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with BookingRepository.acquire_write() as db:
                 cursor = await db.execute(
                     "DELETE FROM bookings WHERE id=? AND user_id=?",
                     (booking_id, user_id),
@@ -192,6 +216,8 @@ class BookingRepository(BaseRepository):
                 deleted = cursor.rowcount > 0
 
                 if deleted:
+                    # Дата удалённой записи неизвестна - сбрасываем кэш целиком
+                    result_cache.clear()
                     logging.info(f"Booking {booking_id} deleted by user {user_id}")
                 else:
                     logging.warning(
@@ -205,16 +231,16 @@ class BookingRepository(BaseRepository):
 
     @staticmethod
     async def cleanup_old_bookings(before_date: str) -> int:
-        """Удалить старые записи"""
+        """Удалить старые записи (порциями, не блокируя запись надолго)"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
-                cursor = await db.execute(
-                    "DELETE FROM bookings WHERE date < ?", (before_date,)
-                )
-                await db.commit()
-                deleted_count = cursor.rowcount
-                logging.info(f"Cleaned up {deleted_count} old bookings")
-                return deleted_count
+            deleted_count = await BookingRepository._delete_in_chunks(
+                "bookings", "date < ?", (before_date,)
+            )
+            result_cache.clear()
+            if deleted_count:
+                await BookingRepository.schedule_optimize()
+            logging.info(f"Cleaned up {deleted_count} old bookings")
+            return deleted_count
         except Exception as e:
             logging.error(f"Error cleaning up old bookings: {e}")
             return 0
@@ -238,19 +264,66 @@ class BookingRepository(BaseRepository):
             logging.error(f"Error getting week schedule: {e}")
             return []
 
+    @staticmethod
+    async def iter_bookings(
+        start_date: str, days: int, chunk_size: int = BOOKINGS_CHUNK_SIZE
+    ) -> AsyncIterator[Tuple[str, str, str]]:
+        """Обойти записи (date, time, username) за N дней страницами по chunk_size
+
+        Keyset-пагинация по (date, time) - индекс UNIQUE(date, time):
+        в памяти одна страница, читатель занят только на время её выборки.
+        Ошибка БД пробрасывается вызывающему (не обрывает обход молча).
+        """
+        end_date = (
+            datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=days)
+        ).strftime("%Y-%m-%d")
+
+        # Время не бывает пустым: (start_date, "") - перед первой записью дня
+        last = (start_date, "")
+        while True:
+            async with BookingRepository.acquire_read() as db:
+                async with db.execute(
+                    """SELECT date, time, username FROM bookings
+                    WHERE (date, time) > (?, ?) AND date <= ?
+                    ORDER BY date, time LIMIT ?""",
+                    (*last, end_date, chunk_size),
+                ) as cursor:
+                    rows = await cursor.fetchall()
+            if not rows:
+                return
+
+            for row in rows:
+                yield row
+
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1][:2]
+
     @staticmethod
     async def block_slot(
-        date_str: str, time_str: str, admin_id: int, reason: str = None
+        date_str: str,
+        time_str: str,
+        admin_id: int,
+        reason: str = None,
+        *,
+        timestamp: Optional[str] = None,
     ) -> bool:
         """Заблокировать слот"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with BookingRepository.acquire_write() as db:
                 await db.execute(
                     "INSERT INTO blocked_slots (date, time, reason, blocked_by, blocked_at) "
                     "VALUES (?, ?, ?, ?, ?)",
-                    (date_str, time_str, reason, admin_id, now_local().isoformat()),
+                    (
+                        date_str,
+                        time_str,
+                        reason,
+                        admin_id,
+                        timestamp or now_local().isoformat(),
+                    ),
                 )
                 await db.commit()
+                result_cache.invalidate_date(date_str)
                 logging.info(f"Slot {date_str} {time_str} blocked by admin {admin_id}")
                 return True
         except aiosqlite.IntegrityError:
@@ -260,11 +333,54 @@ class BookingRepository(BaseRepository):
             logging.error(f"Error blocking slot {date_str} {time_str}: {e}")
             return False
 
+    @staticmethod
+    async def block_slots_bulk(
+        date_str: str,
+        times: List[str],
+        admin_id: int,
+        reason: str = None,
+        *,
+        timestamp: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """Заблокировать несколько слотов дня одной транзакцией
+
+        Returns:
+            (заблокировано, уже были заблокированы)
+        """
+        blocked_at = timestamp or now_local().isoformat()
+        try:
+            async with BookingRepository.acquire_write() as db:
+                # Уже заблокированные слоты пропускает OR IGNORE - без
+                # исключения на каждый, как в block_slot
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = await db.executemany(
+                        "INSERT OR IGNORE INTO blocked_slots "
+                        "(date, time, reason, blocked_by, blocked_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        [(date_str, t, reason, admin_id, blocked_at) for t in times],
+                    )
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+
+            blocked = cursor.rowcount
+            if blocked:
+                result_cache.invalidate_date(date_str)
+            logging.info(
+                f"{blocked}/{len(times)} slots on {date_str} blocked by admin {admin_id}"
+            )
+            return blocked, len(times) - blocked
+        except Exception as e:
+            logging.error(f"Error blocking slots on {date_str}: {e}")
+            return 0, len(times)
+
     @staticmethod
     async def unblock_slot(date_str: str, time_str: str) -> bool:
         """Разблокировать слот"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with BookingRepository.acquire_write() as db:
                 cursor = await db.execute(
                     "DELETE FROM blocked_slots WHERE date = ? AND time = ?",
                     (date_str, time_str),
@@ -272,6 +388,7 @@ class BookingRepository(BaseRepository):
                 await db.commit()
                 deleted = cursor.rowcount > 0
                 if deleted:
+                    result_cache.invalidate_date(date_str)
                     logging.info(f"Slot {date_str} {time_str} unblocked")
                 return deleted
         except Exception as e:
@@ -279,8 +396,9 @@ class BookingRepository(BaseRepository):
             return False
 
     @staticmethod
+    @result_cache.cached(lambda date_str=None: f"bs:{date_str or '*'}")
     async def get_blocked_slots(date_str: str = None) -> List[Tuple]:
-        """Получить заблокированные слоты"""
+        """Получить заблокированные слоты (кэшируется, список не изменять)"""
         if date_str:
             query = "SELECT date, time, reason FROM blocked_slots WHERE date = ? ORDER BY time"
             params = (date_str,)
@@ -288,6 +406,6 @@ class BookingRepository(BaseRepository):
             query = "SELECT date, time, reason FROM blocked_slots ORDER BY date, time"
             params = ()
 
-        return (
-            await BookingRepository._execute_query(query, params, fetch_all=True) or []
-        )
+        rows = await BookingRepository._execute_query(query, params, fetch_all=True)
+        # None - ошибка БД (залогирована): пустой список без кэширования
+        return Uncached([]) if rows is None else rows
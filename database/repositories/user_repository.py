@@ -1,75 +1,112 @@
 """Репозиторий для работы с пользователями"""
 
 import logging
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
 from database.base_repository import BaseRepository
+from database.cache import Uncached, result_cache
 from utils.helpers import now_local
 
+# Размер страницы при обходе пользователей (рассылка)
+USERS_CHUNK_SIZE = 500
+
 
 class UserRepository(BaseRepository):
     """Репозиторий для управления пользователями"""
 
     @staticmethod
-    async def is_new_user(user_id: int) -> bool:
-        """Проверить новый ли пользователь"""
+    async def is_new_user(user_id: int, *, timestamp: Optional[str] = None) -> bool:
+        """Проверить новый ли пользователь (и зарегистрировать его)"""
         try:
-            exists = await UserRepository._exists("users", "user_id=?", (user_id,))
-
-            if not exists:
-                # Добавляем нового пользователя
-                await UserRepository._execute_query(
-                    "INSERT INTO users (user_id, first_seen) VALUES (?, ?)",
-                    (user_id, now_local().isoformat()),
-                    commit=True,
-                )
-                return True
-            return False
+            # Проверка и вставка одним атомарным запросом (SQLite 3.35+):
+            # строка из RETURNING есть только если пользователь вставлен
+            inserted = await UserRepository.prepared(
+                "add_user",
+                (user_id, timestamp or now_local().isoformat()),
+                fetch_one=True,
+                commit=True,
+            )
+            return inserted is not None
         except Exception as e:
             logging.error(f"Error checking new user {user_id}: {e}")
             return False
 
+    @staticmethod
+    async def iter_all_users(chunk_size: int = USERS_CHUNK_SIZE) -> AsyncIterator[int]:
+        """Обойти всех user_id страницами по chunk_size
+
+        Keyset-пагинация по первичному ключу: в памяти одна страница,
+        а соединение-читатель занято только на время её выборки, а не
+        на всю (долгую) рассылку. Ошибка БД пробрасывается вызывающему
+        (не выглядит как конец таблицы).
+        """
+        last_id = None
+        while True:
+            if last_id is None:
+                query = "SELECT user_id FROM users ORDER BY user_id LIMIT ?"
+                params = (chunk_size,)
+            else:
+                query = (
+                    "SELECT user_id FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?"
+                )
+                params = (last_id, chunk_size)
+            async with UserRepository.acquire_read() as db:
+                async with db.execute(query, params) as cursor:
+                    rows = await cursor.fetchall()
+            if not rows:
+                return
+
+            for (user_id,) in rows:
+                yield user_id
+
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
     @staticmethod
     async def get_all_users() -> List[int]:
         """Получить список всех user_id"""
         try:
-            users = await UserRepository._execute_query(
-                "SELECT user_id FROM users", fetch_all=True
-            )
-            return [user_id for (user_id,) in users] if users else []
+            return [user_id async for user_id in UserRepository.iter_all_users()]
         except Exception as e:
             logging.error(f"Error getting all users: {e}")
             return []
 
     @staticmethod
     async def get_total_users_count() -> int:
-        """Получить общее количество пользователей"""
-        return await UserRepository._count("users")
+        """Получить общее количество пользователей (счетчик app_stats)"""
+        result = await UserRepository._execute_query(
+            "SELECT total_users FROM app_stats WHERE id = 1", fetch_one=True
+        )
+        return result[0] if result else 0
 
     @staticmethod
+    @result_cache.cached(lambda user_id: f"fs:{user_id}")
     async def get_favorite_slots(user_id: int) -> Tuple[Optional[str], Optional[int]]:
         """Анализ предпочтений пользователя"""
         try:
-            # Любимое время
-            fav_time_result = await UserRepository._execute_query(
-                "SELECT time, COUNT(*) as cnt FROM bookings WHERE user_id=? "
-                "GROUP BY time ORDER BY cnt DESC LIMIT 1",
-                (user_id,),
-                fetch_one=True,
-            )
-            fav_time = fav_time_result[0] if fav_time_result else None
-
-            # Любимый день недели
-            fav_dow_result = await UserRepository._execute_query(
-                """SELECT CAST(strftime('%w', date) AS INTEGER) as dow, COUNT(*) as cnt
-                FROM bookings WHERE user_id=?
-                GROUP BY dow ORDER BY cnt DESC LIMIT 1""",
+            # Любимое время и день недели - один проход по записям пользователя.
+            # Голый столбец рядом с MAX() SQLite берёт из строки с максимумом:
+            # самая частая группа находится без сортировки групп по счётчику
+            row = await UserRepository._execute_query(
+                """WITH user_rows AS (
+                    SELECT time, CAST(strftime('%w', date) AS INTEGER) AS dow
+                    FROM bookings WHERE user_id=?
+                ),
+                t AS (SELECT time, MAX(c) FROM
+                      (SELECT time, COUNT(*) AS c FROM user_rows GROUP BY time)),
+                d AS (SELECT dow, MAX(c) FROM
+                      (SELECT dow, COUNT(*) AS c FROM user_rows GROUP BY dow))
+                SELECT (SELECT time FROM t), (SELECT dow FROM d)""",
                 (user_id,),
                 fetch_one=True,
             )
-            fav_dow = int(fav_dow_result[0]) if fav_dow_result else None
+            if row is None:  # ошибка БД (залогирована) - не кэшировать
+                return Uncached((None, None))
+            fav_time, fav_dow = row
+            fav_dow = int(fav_dow) if fav_dow is not None else None
 
             return fav_time, fav_dow
         except Exception as e:
             logging.error(f"Error getting favorite slots for {user_id}: {e}")
-            return None, None
+            return Uncached((None, None))
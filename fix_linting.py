@@ -1,8 +1,39 @@
 #!/usr/bin/env python3
 """Скрипт автоматического исправления линтинг-ошибок"""
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Dict, List, Optional
+
+# Потоков для обработки файлов (работа упирается в чтение/запись)
+MAX_WORKERS = 32
+
+# Подписи (mtime_ns, size) уже обработанных файлов: при повторном запуске
+# неизменённые файлы не читаются
+CACHE_FILE = Path(".fix_linting_cache.json")
+
+# Каталоги, в которые обход не заходит
+EXCLUDED_DIRS = frozenset({"venv", "__pycache__", ".git", "htmlcov", ".pytest_cache"})
+
+# Шаблоны компилируются один раз при импорте, а не ищутся в кэше re на
+# каждый вызов
+_BARE_EXCEPT = re.compile(r"except\s*:")
+# f-строка без {} в пределах одной строки кода. Внутри [...] обратная ссылка
+# \1 не работает (это символ \x01), поэтому закрывающая кавычка исключается
+# через (?!\1). Перед f не должно быть буквы или кавычки: иначе "if" + "a"
+# превращалось в "i" + "a". После закрывающей кавычки не должна идти
+# такая же: иначе начало f-строки в тройных кавычках принималось за пустую
+# f-строку, и префикс f терялся
+_EMPTY_F = re.compile(r"""(?<![\w"'])f(["'])((?:(?!\1)[^{}\\\n])*)\1(?!\1)""")
+# Однострочный импорт из database.models: отступ с "from ... import ",
+# список имён и комментарий. Строки, где текст импорта лишь упоминается
+# (как в этом файле), не совпадают
+_MODELS_IMPORT = re.compile(
+    r"^(\s*from\s+database\.models\s+import\s+)([\w\s,]+?)\s*(#.*)?$"
+)
 
 
 def fix_trailing_whitespace(content: str) -> str:
@@ -26,28 +57,63 @@ def fix_blank_line_whitespace(content: str) -> str:
 
 def fix_bare_except(content: str) -> str:
     """Исправляет bare except (E722)"""
-    content = re.sub(r"except\s*:", "except Exception:", content)
-    return content
+    return _BARE_EXCEPT.sub("except Exception:", content)
 
 
 def fix_f_string_placeholders(content: str) -> str:
     """Исправляет f-strings без placeholders (F541)"""
-    content = re.sub(r'f(["\'])([^{}\1]*?)\1', r"\1\2\1", content)
-    return content
+    return _EMPTY_F.sub(r"\1\2\1", content)
+
+
+def _drop_stale_import(line: str) -> Optional[str]:
+    """Убрать из строки импорт удалённой модели Booking
+
+    Returns:
+        None - если Booking был единственным именем (строка удаляется),
+        иначе строка без Booking в списке имён (или исходная строка)
+    """
+    match = _MODELS_IMPORT.match(line)
+    if match is None:
+        return line
+
+    prefix, names, comment = match.groups()
+    names = [name.strip() for name in names.split(",")]
+    if "Booking" not in names:
+        return line
+
+    rest = [name for name in names if name != "Booking"]
+    if not rest:
+        return None
+    fixed = prefix + ", ".join(rest)
+    return f"{fixed}  {comment}" if comment else fixed
 
 
 def fix_unused_imports(content: str) -> str:
     """Удаляет неиспользуемые импорты (F401)"""
-    lines = content.split("\n")
-    fixed_lines = []
+    lines = (_drop_stale_import(line) for line in content.split("\n"))
+    return "\n".join(line for line in lines if line is not None)
 
-    for line in lines:
-        if "from database.models import Booking" in line:
-            continue
-        if "import Booking" in line and "database.models" in line:
+
+def transform(content: str) -> str:
+    """Все исправления fix_file за один проход по строкам
+
+    Равносильно последовательному вызову fix_trailing_whitespace,
+    fix_blank_line_whitespace, fix_bare_except, fix_f_string_placeholders
+    и fix_unused_imports: шаблоны не выходят за пределы строки.
+    """
+    fixed_lines = []
+    for line in content.split("\n"):
+        line = _drop_stale_import(line)
+        if line is None:
             continue
+        # W291 и W293: пустая после rstrip строка уже очищена
+        line = line.rstrip()
+        # Регулярные выражения - только для строк, где они могут сработать
+        if "except" in line:
+            line = _BARE_EXCEPT.sub("except Exception:", line)
+        if "f\"" in line or "f'" in line:
+            line = _EMPTY_F.sub(r"\1\2\1", line)
         fixed_lines.append(line)
-
     return "\n".join(fixed_lines)
 
 
@@ -80,57 +146,99 @@ def fix_long_lines(content: str, max_length: int = 127) -> str:
     return "\n".join(fixed_lines)
 
 
-def fix_file(filepath: Path) -> bool:
-    """Исправляет один файл"""
+def _signature(filepath: Path) -> List[int]:
+    """Подпись файла для кэша: время изменения и размер"""
+    st = filepath.stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def load_cache() -> Dict[str, List[int]]:
+    """Прочитать кэш подписей (битый или отсутствующий - пустой)"""
     try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: Dict[str, List[int]]):
+    """Записать кэш атомарно: через временный файл и os.replace"""
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+
+def fix_file(filepath: Path, cache: Optional[Dict[str, List[int]]] = None) -> bool:
+    """Исправляет один файл
+
+    С cache файл с той же подписью, что и после прошлого запуска,
+    пропускается без чтения. Каждый поток пишет в cache только свой ключ.
+    """
+    key = str(filepath)
+    try:
+        if cache is not None and cache.get(key) == _signature(filepath):
+            return False
+
         with open(filepath, "r", encoding="utf-8") as f:
             content = f.read()
 
         original_content = content
 
-        content = fix_trailing_whitespace(content)
-        content = fix_blank_line_whitespace(content)
-        content = fix_bare_except(content)
-        content = fix_f_string_placeholders(content)
-        content = fix_unused_imports(content)
+        content = transform(content)
 
         if content != original_content:
             with open(filepath, "w", encoding="utf-8") as f:
                 f.write(content)
             print(f"✅ Fixed: {filepath}")
-            return True
+            fixed = True
         else:
             print(f"⏭️  Skipped: {filepath} (no changes)")
-            return False
+            fixed = False
+
+        if cache is not None:
+            cache[key] = _signature(filepath)
+        return fixed
 
     except Exception as e:
         print(f"❌ Error fixing {filepath}: {e}")
         return False
 
 
+def find_python_files(root: str = ".") -> List[Path]:
+    """Найти .py файлы, не заходя в EXCLUDED_DIRS
+
+    Обход стеком через os.scandir: тип записи известен из самого каталога
+    без отдельного stat, Path создаётся только для найденных файлов.
+    """
+    found = []
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in EXCLUDED_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".py"):
+                    found.append(Path(entry.path))
+    return found
+
+
 def main():
     """Главная функция"""
     print("🔧 Fixing linting errors...\n")
 
-    python_files = []
-    for root, dirs, files in os.walk("."):
-        dirs[:] = [
-            d
-            for d in dirs
-            if d not in ["venv", "__pycache__", ".git", "htmlcov", ".pytest_cache"]
-        ]
-
-        for file in files:
-            if file.endswith(".py"):
-                filepath = Path(root) / file
-                python_files.append(filepath)
+    python_files = find_python_files()
 
     print(f"Found {len(python_files)} Python files\n")
 
-    fixed_count = 0
-    for filepath in sorted(python_files):
-        if fix_file(filepath):
-            fixed_count += 1
+    # Файлы независимы друг от друга: общий только кэш, ключ у каждого свой
+    files = sorted(python_files)
+    cache = load_cache()
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(files)))) as pool:
+        fixed_count = sum(pool.map(partial(fix_file, cache=cache), files))
+    save_cache(cache)
 
     print(f"\n✨ Fixed {fixed_count} files")
     print("\n💡 Tip: Run 'black .' and 'isort .' for final formatting")
@@ -2,52 +2,93 @@
 
 import asyncio
 import csv
-import io
 import logging
-from collections import defaultdict
+import os
+import tempfile
 from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict
 
 from aiogram import F, Router
-from aiogram.filters import Command
+from aiogram.filters import BaseFilter, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.types import (
-    BufferedInputFile,
     CallbackQuery,
+    FSInputFile,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
     Message,
 )
 
-from config import BROADCAST_DELAY, DAY_NAMES
+from config import (
+    BROADCAST_CONCURRENCY,
+    BROADCAST_QUEUE_SIZE,
+    BROADCAST_RATE,
+    DAY_NAMES,
+)
 from database.queries import Database
-from keyboards.admin_keyboards import ADMIN_MENU
+from keyboards.admin_keyboards import (
+    ADMIN_MENU,
+    BACK_TO_BLOCK_SLOTS,
+    BLOCK_SLOTS_MENU,
+    MASS_OPERATIONS_MENU,
+)
 from keyboards.user_keyboards import MAIN_MENU
 from services.analytics_service import AnalyticsService
 from utils.helpers import is_admin, now_local
+from utils.rate_limiter import AsyncRateLimiter
 from utils.states import AdminStates
 
 router = Router()
 
+# Кнопки админ-меню: не-администраторам отвечает deny_access
+_ADMIN_BUTTONS = frozenset(
+    button.text for row in ADMIN_MENU.keyboard for button in row
+)
+
+# Текст дашборда собирается один раз при импорте - в обработчике только
+# подстановка ключей AnalyticsService.get_dashboard_stats()
+_DASHBOARD_TMPL = (
+    "📊 ДАШБОРД\n\n"
+    "👥 Всего пользователей: {total_users}\n"
+    "📅 Активных записей: {active_bookings}\n"
+    "❌ Всего отмен: {total_cancelled}\n"
+    "⭐ Средний рейтинг: {avg_rating:.1f}/5"
+)
+
+# Общий для всех рассылок: две одновременные не превысят лимит вдвоём
+BROADCAST_LIMITER = AsyncRateLimiter(BROADCAST_RATE)
+
+# Строк CSV за один вызов writerows при экспорте
+_EXPORT_BATCH_SIZE = 1000
+
+# Фоновые рассылки по ID администратора (для /broadcast_cancel)
+_active_broadcasts: Dict[int, asyncio.Task] = {}
+
 
-@router.message(Command("admin"))
+class IsAdmin(BaseFilter):
+    """Фильтр: сообщение от администратора
+
+    Проверка выполняется диспетчером только после совпадения текста,
+    обработчики с этим фильтром не проверяют права сами.
+    """
+
+    async def __call__(self, message: Message) -> bool:
+        return is_admin(message.from_user.id)
+
+
+@router.message(Command("admin"), IsAdmin())
 async def admin_panel(message: Message):
     """Вход в админ-панель"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     await message.answer(
         "🔐 АДМИН-ПАНЕЛЬ\n\nВыберите действие:", reply_markup=ADMIN_MENU
     )
 
 
-@router.message(F.text == "🔙 Выход из админки")
+@router.message(F.text == "🔙 Выход из админки", IsAdmin())
 async def exit_admin(message: Message):
     """Выход из админ-панели"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     await message.answer("👋 Вы вышли из админ-панели", reply_markup=MAIN_MENU)
 
 
@@ -67,32 +108,17 @@ async def cancel_command(message: Message, state: FSMContext):
         await message.answer("❌ Действие отменено", reply_markup=MAIN_MENU)
 
 
-@router.message(F.text == "📊 Dashboard")
+@router.message(F.text == "📊 Dashboard", IsAdmin())
 async def dashboard(message: Message):
     """Дашборд"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     stats = await AnalyticsService.get_dashboard_stats()
 
-    await message.answer(
-        "📊 ДАШБОРД\n\n"
-        f"👥 Всего пользователей: {stats['total_users']}\n"
-        f"📅 Активных записей: {stats['active_bookings']}\n"
-        f"❌ Всего отмен: {stats['total_cancelled']}\n"
-        f"⭐ Средний рейтинг: {stats['avg_rating']:.1f}/5",
-        reply_markup=ADMIN_MENU,
-    )
+    await message.answer(_DASHBOARD_TMPL.format_map(stats), reply_markup=ADMIN_MENU)
 
 
-@router.message(F.text == "💡 Рекомендации")
+@router.message(F.text == "💡 Рекомендации", IsAdmin())
 async def recommendations(message: Message):
     """AI-рекомендации"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     recs = await AnalyticsService.get_recommendations()
 
     if not recs:
@@ -101,138 +127,128 @@ async def recommendations(message: Message):
         )
         return
 
-    text = "💡 РЕКОМЕНДАЦИИ:\n\n"
-    for rec in recs:
-        text += f"{rec['icon']} {rec['title']}\n{rec['text']}\n\n"
+    text = "💡 РЕКОМЕНДАЦИИ:\n\n" + "".join(
+        f"{rec['icon']} {rec['title']}\n{rec['text']}\n\n" for rec in recs
+    )
 
     await message.answer(text, reply_markup=ADMIN_MENU)
 
 
-@router.message(F.text == "📅 Расписание")
+@router.message(F.text == "📅 Расписание", IsAdmin())
 async def schedule_view(message: Message):
     """Просмотр расписания на неделю"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     today = now_local()
     start_date = today.strftime("%Y-%m-%d")
 
     # Используем новый метод Database API
     schedule = await Database.get_week_schedule(start_date, days=7)
 
-    # Группируем по датам
-    schedule_by_date = defaultdict(list)
-    for date_str, time_str, username in schedule:
-        schedule_by_date[date_str].append((time_str, username))
+    # Группируем по датам: строки уже отсортированы по (date, time)
+    schedule_by_date = {
+        date_str: list(map(itemgetter(1, 2), rows))
+        for date_str, rows in groupby(schedule, key=itemgetter(0))
+    }
 
-    text = "📅 РАСПИСАНИЕ НА НЕДЕЛЮ\n\n"
+    # Части текста собираются в список и склеиваются один раз
+    parts = ["📅 РАСПИСАНИЕ НА НЕДЕЛЮ\n\n"]
 
     for day_offset in range(7):
         current_date = today + timedelta(days=day_offset)
         date_str = current_date.strftime("%Y-%m-%d")
-        bookings = schedule_by_date.get(date_str, [])
+        bookings = schedule_by_date.get(date_str, ())
 
         if bookings:
             day_name = DAY_NAMES[current_date.weekday()]
-            text += f"📆 {current_date.strftime('%d.%m')} ({day_name})\n"
-            for time_str, username in bookings:
-                text += f"  🕒 {time_str} - @{username}\n"
-            text += "\n"
+            parts.append(f"📆 {current_date.strftime('%d.%m')} ({day_name})\n")
+            parts.extend(
+                f"  🕒 {time_str} - @{username}\n" for time_str, username in bookings
+            )
+            parts.append("\n")
 
-    if len(text.split("\n")) == 3:  # только заголовок
-        text += "📭 Нет записей на ближайшую неделю"
+    if len(parts) == 1:  # только заголовок
+        parts.append("📭 Нет записей на ближайшую неделю")
 
-    await message.answer(text, reply_markup=ADMIN_MENU)
+    await message.answer("".join(parts), reply_markup=ADMIN_MENU)
 
 
-@router.message(F.text == "👥 Клиенты")
+@router.message(F.text == "👥 Клиенты", IsAdmin())
 async def clients_list(message: Message):
     """Список активных клиентов"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
     # Используем новые методы Database API
     top_clients = await Database.get_top_clients(limit=10)
     total_users = await Database.get_total_users_count()
 
-    text = "👥 КЛИЕНТЫ\n\n"
-    text += f"Всего пользователей: {total_users}\n\n"
+    parts = ["👥 КЛИЕНТЫ\n\n", f"Всего пользователей: {total_users}\n\n"]
 
     if top_clients:
-        text += "🏆 ТОП-10 по записям:\n\n"
-        for i, (user_id, total) in enumerate(top_clients, 1):
-            text += f"{i}. ID {user_id}: {total} записей\n"
+        parts.append("🏆 ТОП-10 по записям:\n\n")
+        parts.extend(
+            f"{i}. ID {user_id}: {total} записей\n"
+            for i, (user_id, total) in enumerate(top_clients, 1)
+        )
     else:
-        text += "Пока нет записей"
+        parts.append("Пока нет записей")
 
-    await message.answer(text, reply_markup=ADMIN_MENU)
+    await message.answer("".join(parts), reply_markup=ADMIN_MENU)
 
 
-@router.message(F.text == "⚡ Массовые операции")
+@router.message(F.text == "⚡ Массовые операции", IsAdmin())
 async def mass_operations(message: Message):
     """Меню массовых операций"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="📢 Рассылка всем", callback_data="admin_broadcast"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🗑 Очистить старые записи", callback_data="admin_cleanup"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔒 Заблокировать слоты", callback_data="admin_block_slots"
-                )
-            ],
-            [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_cancel")],
-        ]
-    )
-
     await message.answer(
         "⚡ МАССОВЫЕ ОПЕРАЦИИ\n\n" "⚠️ Будьте осторожны!\n" "Выберите действие:",
-        reply_markup=kb,
+        reply_markup=MASS_OPERATIONS_MENU,
     )
 
 
-@router.message(F.text == "📊 Экспорт данных")
+async def _write_export_csv(fd: int, start_date: str) -> int:
+    """Записать записи за 2 года от start_date в CSV (fd), вернуть их число"""
+    total = 0
+    with open(fd, "w", encoding="utf-8-sig", newline="") as f:  # BOM для Excel
+        writer = csv.writer(f)
+        writer.writerow(["Дата", "Время", "Username"])
+        # Строки БД - кортежи (date, time, username) в порядке колонок CSV.
+        # Пишутся пачками: цикл по строкам пачки идёт внутри writerows (C)
+        batch = []
+        async for row in Database.iter_bookings(start_date, days=730):
+            batch.append(row)
+            if len(batch) == _EXPORT_BATCH_SIZE:
+                writer.writerows(batch)
+                total += len(batch)
+                batch.clear()
+        writer.writerows(batch)
+        total += len(batch)
+    return total
+
+
+@router.message(F.text == "📊 Экспорт данных", IsAdmin())
 async def export_data(message: Message):
     """Экспорт данных в CSV"""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ Нет доступа")
-        return
-
-    # Получаем все записи через Database API
     today = now_local()
     start_date = (today - timedelta(days=365)).strftime("%Y-%m-%d")  # За последний год
-    bookings_data = await Database.get_week_schedule(start_date, days=730)  # 2 года
-
-    # Создаем CSV в памяти
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Дата", "Время", "Username"])
-
-    for date_str, time_str, username in bookings_data:
-        writer.writerow([date_str, time_str, username])
 
-    # Отправляем файл
-    csv_data = output.getvalue().encode("utf-8-sig")  # BOM для Excel
-    file = BufferedInputFile(csv_data, filename="bookings_export.csv")
+    # CSV пишется во временный файл по мере чтения страниц из БД, а aiogram
+    # отправляет его с диска частями: ни выборка, ни файл целиком в памяти
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        try:
+            total = await _write_export_csv(fd, start_date)
+        except Exception as e:
+            # Неполный файл не отправляется: выгрузка либо целиком, либо никак
+            logging.error(f"Export failed: {e}")
+            await message.answer(
+                "❌ Не удалось выгрузить данные, попробуйте позже",
+                reply_markup=ADMIN_MENU,
+            )
+            return
 
-    await message.answer_document(
-        file,
-        caption=f"📊 Экспорт записей\n\nВсего записей: {len(bookings_data)}",
-        reply_markup=ADMIN_MENU,
-    )
+        await message.answer_document(
+            FSInputFile(path, filename="bookings_export.csv"),
+            caption=f"📊 Экспорт записей\n\nВсего записей: {total}",
+            reply_markup=ADMIN_MENU,
+        )
+    finally:
+        os.unlink(path)
 
 
 # === ОБРАБОТЧИКИ МАССОВЫХ ОПЕРАЦИЙ ===
@@ -255,6 +271,102 @@ async def broadcast_start(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+async def _send_broadcast(bot, user_id: int, text: str) -> bool:
+    """Отправить сообщение рассылки одному пользователю"""
+    async with BROADCAST_LIMITER:
+        try:
+            await bot.send_message(user_id, text)
+            return True
+        except Exception as e:
+            # Улучшенное логирование ошибок
+            logging.error(f"Broadcast failed for user_id={user_id}: {e}")
+            return False
+
+
+async def _run_broadcast(bot, text: str, admin_chat_id: int):
+    """Рассылка всем пользователям с отчётом администратору по завершении"""
+    success_count = 0
+    fail_count = 0
+    read_error = None
+
+    # Производитель читает user_id страницами из БД в ограниченную очередь,
+    # BROADCAST_CONCURRENCY отправителей разбирают её: в памяти не больше
+    # BROADCAST_QUEUE_SIZE id, задач - фиксированное число, а не по одной
+    # на пользователя. Темп задаёт BROADCAST_LIMITER
+    queue: asyncio.Queue = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+
+    async def produce():
+        nonlocal read_error
+        try:
+            async for user_id in Database.iter_all_users():
+                await queue.put(user_id)
+        except Exception as e:
+            # Уже прочитанные id отправители дорабатывают, итог - с ошибкой
+            read_error = e
+        for _ in range(BROADCAST_CONCURRENCY):
+            await queue.put(None)
+
+    async def consume():
+        nonlocal success_count, fail_count
+        while True:
+            user_id = await queue.get()
+            if user_id is None:
+                return
+            if await _send_broadcast(bot, user_id, text):
+                success_count += 1
+            else:
+                fail_count += 1
+
+    workers = [
+        asyncio.create_task(consume()) for _ in range(BROADCAST_CONCURRENCY)
+    ]
+    status = "✅ Рассылка завершена!"
+    try:
+        await asyncio.gather(produce(), *workers)
+        if read_error is not None:
+            logging.error(f"Broadcast aborted: failed to read users: {read_error}")
+            status = "❌ Рассылка прервана из-за ошибки"
+    except asyncio.CancelledError:
+        status = "⛔ Рассылка остановлена"
+        raise
+    except Exception as e:
+        logging.error(f"Broadcast aborted: {e}")
+        status = "❌ Рассылка прервана из-за ошибки"
+    finally:
+        # Счётчики уже учитывают завершённые отправки, остальные отменяются
+        for worker in workers:
+            worker.cancel()
+
+        try:
+            await bot.send_message(
+                admin_chat_id,
+                f"{status}\n\n"
+                f"Обработано пользователей: {success_count + fail_count}\n"
+                f"Успешно: {success_count}\n"
+                f"Ошибок: {fail_count}",
+                reply_markup=ADMIN_MENU,
+            )
+        except Exception as e:
+            logging.error(f"Broadcast report failed: {e}")
+
+        logging.info(
+            f"Broadcast finished ({status}). "
+            f"Success: {success_count}, Failed: {fail_count}"
+        )
+
+
+@router.message(Command("broadcast_cancel"), IsAdmin())
+async def broadcast_cancel(message: Message):
+    """Остановить фоновую рассылку"""
+    task = _active_broadcasts.get(message.from_user.id)
+    if task is None:
+        await message.answer("Нет активной рассылки", reply_markup=ADMIN_MENU)
+        return
+
+    # Итог с числом уже отправленных сообщений пришлёт сама рассылка
+    task.cancel()
+
+
 @router.message(AdminStates.awaiting_broadcast_message)
 async def broadcast_execute(message: Message, state: FSMContext):
     """Выполнение рассылки с rate limiting (SECURE)"""
@@ -274,39 +386,32 @@ async def broadcast_execute(message: Message, state: FSMContext):
         await message.answer("❌ Рассылка отменена", reply_markup=ADMIN_MENU)
         return
 
-    broadcast_text = message.text
-
-    # Используем новый метод Database API
-    user_ids = await Database.get_all_users()
+    admin_id = message.from_user.id
+    await state.clear()
 
-    await message.answer(f"📤 Начинаю рассылку {len(user_ids)} пользователям...")
+    if admin_id in _active_broadcasts:
+        await message.answer(
+            "⏳ Предыдущая рассылка ещё идёт.\n\nОстановить: /broadcast_cancel",
+            reply_markup=ADMIN_MENU,
+        )
+        return
 
-    success_count = 0
-    fail_count = 0
+    total_users = await Database.get_total_users_count()
 
-    # Используем константу из config
-    for user_id in user_ids:
-        try:
-            await message.bot.send_message(user_id, broadcast_text)
-            await asyncio.sleep(BROADCAST_DELAY)  # Используем константу
-            success_count += 1
-        except Exception as e:
-            # Улучшенное логирование ошибок
-            logging.error(f"Broadcast failed for user_id={user_id}: {e}")
-            fail_count += 1
+    # Рассылка идёт в фоне: обработчик сразу освобождается, итог придёт
+    # отдельным сообщением. Ссылка на задачу хранится до её завершения
+    task = asyncio.create_task(
+        _run_broadcast(message.bot, message.text, message.chat.id)
+    )
+    _active_broadcasts[admin_id] = task
+    task.add_done_callback(lambda _: _active_broadcasts.pop(admin_id, None))
 
-    await state.clear()
     await message.answer(
-        "✅ Рассылка завершена!\n\n"
-        f"Успешно: {success_count}\n"
-        f"Ошибок: {fail_count}",
+        f"📤 Рассылка {total_users} пользователям запущена в фоне.\n\n"
+        "Остановить: /broadcast_cancel",
         reply_markup=ADMIN_MENU,
     )
 
-    logging.info(
-        f"Broadcast completed by admin. Success: {success_count}, Failed: {fail_count}"
-    )
-
 
 @router.callback_query(F.data == "admin_cleanup")
 async def cleanup_old_bookings(callback: CallbackQuery):
@@ -335,35 +440,10 @@ async def block_slots_menu(callback: CallbackQuery):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
 
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="🔒 Заблокировать слот", callback_data="block_slot_start"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔓 Разблокировать слот", callback_data="unblock_slot_start"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="📋 Список блокировок", callback_data="list_blocked_slots"
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text="🔙 Назад", callback_data="admin_cancel"
-                )
-            ],
-        ]
-    )
-
     await callback.message.edit_text(
         "🔒 БЛОКИРОВКА СЛОТОВ\n\n"
         "Выберите действие:",
-        reply_markup=kb
+        reply_markup=BLOCK_SLOTS_MENU
     )
     await callback.answer()
 
@@ -509,19 +589,16 @@ async def block_slot_reason(message: Message, state: FSMContext):
     
     # Блокировка всего дня
     if time_str == "all":
-        from config import WORK_HOURS_START, WORK_HOURS_END
-        
-        blocked_count = 0
-        failed_count = 0
-        
-        for hour in range(WORK_HOURS_START, WORK_HOURS_END):
-            slot_time = f"{hour:02d}:00"
-            success = await Database.block_slot(date_str, slot_time, admin_id, reason)
-            if success:
-                blocked_count += 1
-            else:
-                failed_count += 1
-        
+        from config import WORK_SLOTS
+
+        # Все слоты дня - одной транзакцией
+        blocked_count, failed_count = await Database.block_slots_bulk(
+            date_str, WORK_SLOTS, admin_id, reason
+        )
+
+        if blocked_count:
+            await Database.schedule_optimize()
+
         await state.clear()
         await message.answer(
             f"✅ Блокировка завершена!\n\n"
@@ -583,9 +660,7 @@ async def unblock_slot_menu(callback: CallbackQuery):
             )
         ])
     
-    keyboard.append([
-        InlineKeyboardButton(text="🔙 Назад", callback_data="admin_block_slots")
-    ])
+    keyboard.append(BACK_TO_BLOCK_SLOTS.inline_keyboard[0])
     
     kb = InlineKeyboardMarkup(inline_keyboard=keyboard)
     
@@ -604,9 +679,11 @@ async def unblock_slot_confirm(callback: CallbackQuery):
         await callback.answer("❌ Нет доступа", show_alert=True)
         return
 
-    try:
-        _, date_str, time_str = callback.data.split(":", 2)
-    except ValueError:
+    # unblock:YYYY-MM-DD:HH:MM - префикс уже проверен фильтром, время само
+    # содержит ":", поэтому дата отделяется по первому двоеточию остатка
+    _, _, rest = callback.data.partition(":")
+    date_str, _, time_str = rest.partition(":")
+    if not date_str or not time_str:
         await callback.answer("❌ Ошибка данных", show_alert=True)
         return
 
@@ -634,25 +711,20 @@ async def list_blocked_slots(callback: CallbackQuery):
     if not blocked:
         await callback.message.edit_text(
             "✅ Нет заблокированных слотов",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[[
-                InlineKeyboardButton(text="🔙 Назад", callback_data="admin_block_slots")
-            ]])
+            reply_markup=BACK_TO_BLOCK_SLOTS,
         )
         return
 
-    text = f"📋 ЗАБЛОКИРОВАННЫЕ СЛОТЫ ({len(blocked)})\n\n"
-    
+    parts = [f"📋 ЗАБЛОКИРОВАННЫЕ СЛОТЫ ({len(blocked)})\n\n"]
+
     for date_str, time_str, reason in blocked[:50]:  # Лимит 50
-        text += f"🔒 {date_str} {time_str}"
+        parts.append(f"🔒 {date_str} {time_str}")
         if reason:
-            text += f"\n   💬 {reason}\n"
-        text += "\n"
+            parts.append(f"\n   💬 {reason}\n")
+        parts.append("\n")
+    text = "".join(parts)
 
-    kb = InlineKeyboardMarkup(inline_keyboard=[[
-        InlineKeyboardButton(text="🔙 Назад", callback_data="admin_block_slots")
-    ]])
-    
-    await callback.message.edit_text(text, reply_markup=kb)
+    await callback.message.edit_text(text, reply_markup=BACK_TO_BLOCK_SLOTS)
     await callback.answer()
 
 
@@ -662,3 +734,10 @@ async def admin_cancel_operation(callback: CallbackQuery):
     """Отмена админской операции"""
     await callback.message.delete()
     await callback.answer("Отменено")
+
+
+@router.message(Command("admin", "broadcast_cancel"))
+@router.message(F.text.in_(_ADMIN_BUTTONS))
+async def deny_access(message: Message):
+    """Команды админки от не-администратора (регистрируется последним)"""
+    await message.answer("❌ Нет доступа")
@@ -33,7 +33,7 @@ from keyboards.user_keyboards import (
 )
 from services.booking_service import BookingService
 from services.notification_service import NotificationService
-from utils.helpers import now_local
+from utils.helpers import format_days_left, now_local
 
 router = Router()
 
@@ -319,22 +319,16 @@ async def my_bookings(message: Message):
     for i, (booking_id, date_str, time_str, username, created_at) in enumerate(
         bookings, 1
     ):
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        booking_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-        booking_dt = booking_dt.replace(tzinfo=TIMEZONE)
+        booking_dt = datetime.fromisoformat(f"{date_str}T{time_str}").replace(
+            tzinfo=TIMEZONE
+        )
 
         days_left = (booking_dt.date() - now.date()).days
         # ИСПРАВЛЕНО: Использование DAY_NAMES вместо hardcoded
-        day_name = DAY_NAMES[date_obj.weekday()]
+        day_name = DAY_NAMES[booking_dt.weekday()]
 
-        text += f"{i}. 📅 {date_obj.strftime('%d.%m')} ({day_name}) 🕒 {time_str}"
-
-        if days_left == 0:
-            text += " — сегодня!\n"
-        elif days_left == 1:
-            text += " — завтра\n"
-        else:
-            text += f" — через {days_left} дн.\n"
+        text += f"{i}. 📅 {booking_dt.strftime('%d.%m')} ({day_name}) 🕒 {time_str}"
+        text += f"{format_days_left(days_left)}\n"
 
         keyboard.append(
             [
@@ -1,6 +1,11 @@
 """Клавиатуры для администратора"""
 
-from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    ReplyKeyboardMarkup,
+)
 
 ADMIN_MENU = ReplyKeyboardMarkup(
     keyboard=[
@@ -14,3 +19,49 @@ ADMIN_MENU = ReplyKeyboardMarkup(
     ],
     resize_keyboard=True,
 )
+
+# Статичные inline-меню создаются один раз при импорте, а не в каждом
+# обработчике: разметка одинакова для всех и обработчиками не изменяется
+MASS_OPERATIONS_MENU = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="📢 Рассылка всем", callback_data="admin_broadcast")],
+        [
+            InlineKeyboardButton(
+                text="🗑 Очистить старые записи", callback_data="admin_cleanup"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🔒 Заблокировать слоты", callback_data="admin_block_slots"
+            )
+        ],
+        [InlineKeyboardButton(text="❌ Отмена", callback_data="admin_cancel")],
+    ]
+)
+
+BLOCK_SLOTS_MENU = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(
+                text="🔒 Заблокировать слот", callback_data="block_slot_start"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="🔓 Разблокировать слот", callback_data="unblock_slot_start"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text="📋 Список блокировок", callback_data="list_blocked_slots"
+            )
+        ],
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_cancel")],
+    ]
+)
+
+BACK_TO_BLOCK_SLOTS = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(text="🔙 Назад", callback_data="admin_block_slots")]
+    ]
+)
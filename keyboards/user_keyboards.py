@@ -16,9 +16,9 @@ from config import (
     DAY_NAMES,
     DAY_NAMES_SHORT,
     MONTH_NAMES,
-    TIMEZONE,
     WORK_HOURS_END,
     WORK_HOURS_START,
+    WORK_SLOTS,
 )
 from database.queries import Database
 from utils.helpers import now_local
@@ -180,17 +180,17 @@ async def create_time_slots(
     free_count = 0
     total_slots = WORK_HOURS_END - WORK_HOURS_START
 
-    for hour in range(WORK_HOURS_START, WORK_HOURS_END):
-        time_str = f"{hour:02d}:00"
-        
-        # ИСПРАВЛЕНО: Используем TIMEZONE.localize() вместо .replace()
-        slot_datetime_naive = datetime.combine(
-            date_obj.date(), datetime.strptime(time_str, "%H:%M").time()
-        )
-        slot_datetime = TIMEZONE.localize(slot_datetime_naive)
+    # Контекст переноса не меняется между слотами - читаем один раз
+    data = await state.get_data() if state else {}
+    is_rescheduling = data.get("reschedule_booking_id") is not None
+
+    # "HH:MM" сравнивается лексикографически в хронологическом порядке -
+    # разбирать время каждого слота в datetime не нужно
+    now_hm = now.strftime("%H:%M")
 
+    for time_str in WORK_SLOTS:
         # ✅ ИСПРАВЛЕНО: Пропускаем прошедшие слоты сегодня
-        if is_today and slot_datetime <= now:
+        if is_today and time_str <= now_hm:
             continue
 
         is_free = time_str not in occupied_slots
@@ -203,10 +203,6 @@ async def create_time_slots(
         if not keyboard or len(keyboard[-1]) == 3:
             keyboard.append([])
 
-        # Проверяем контекст переноса
-        data = await state.get_data() if state else {}
-        is_rescheduling = data.get("reschedule_booking_id") is not None
-
         if is_free:
             callback_data = (
                 f"reschedule_time:{date_str}:{time_str}"
@@ -15,7 +15,16 @@ from services.notification_service import NotificationService
 from utils.retry import async_retry
 from utils.sqlite_storage import SQLiteStorage, init_fsm_storage
 from database.migrations.migration_manager import MigrationManager
-from database.migrations.versions import InitialSchema, AddVersionColumn
+from database.queries import Database
+from database.migrations.versions import (
+    AddAppStats,
+    AddUserBookingCounts,
+    AddVersionColumn,
+    CoveringIndexes,
+    DropDuplicateIndexes,
+    DropRedundantSlotIndexes,
+    InitialSchema,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -29,6 +38,11 @@ async def init_database():
     # Регистрируем миграции
     manager.register(InitialSchema)
     manager.register(AddVersionColumn)
+    manager.register(DropDuplicateIndexes)
+    manager.register(CoveringIndexes)
+    manager.register(DropRedundantSlotIndexes)
+    manager.register(AddUserBookingCounts)
+    manager.register(AddAppStats)
     
     # Применяем миграции
     await manager.migrate()
@@ -67,6 +81,7 @@ async def start_bot():
 
     # ИСПРАВЛЕНО: Инициализация БД с миграциями
     await init_database()
+    await Database.start()
 
     # Сервисы
     booking_service = BookingService(scheduler, bot)
@@ -98,6 +113,7 @@ async def start_bot():
     finally:
         await bot.session.close()
         await storage.close()
+        await Database.close()
         scheduler.shutdown()
 
 
@@ -13,7 +13,15 @@ import sys
 import logging
 
 from database.migrations.migration_manager import MigrationManager
-from database.migrations.versions import InitialSchema, AddVersionColumn
+from database.migrations.versions import (
+    AddAppStats,
+    AddUserBookingCounts,
+    AddVersionColumn,
+    CoveringIndexes,
+    DropDuplicateIndexes,
+    DropRedundantSlotIndexes,
+    InitialSchema,
+)
 from config import DATABASE_PATH
 
 logging.basicConfig(
@@ -39,6 +47,11 @@ async def main():
     # Register all migrations
     manager.register(InitialSchema)
     manager.register(AddVersionColumn)
+    manager.register(DropDuplicateIndexes)
+    manager.register(CoveringIndexes)
+    manager.register(DropRedundantSlotIndexes)
+    manager.register(AddUserBookingCounts)
+    manager.register(AddAppStats)
     # Добавьте здесь новые миграции
     
     command = sys.argv[1].lower()
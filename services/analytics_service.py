@@ -3,9 +3,7 @@
 from datetime import timedelta
 from typing import Dict, List
 
-import aiosqlite
-
-from config import DATABASE_PATH
+from database.base_repository import BaseRepository
 from utils.helpers import now_local
 
 
@@ -15,28 +13,26 @@ class AnalyticsService:
     @staticmethod
     async def get_dashboard_stats() -> Dict:
         """Статистика для дашборда"""
-        async with aiosqlite.connect(DATABASE_PATH) as db:
-            # Общая статистика
-            async with db.execute("SELECT COUNT(*) FROM users") as cursor:
-                total_users = (await cursor.fetchone())[0]
-
-            async with db.execute("SELECT COUNT(*) FROM bookings") as cursor:
-                active_bookings = (await cursor.fetchone())[0]
-
+        # Все показатели одним SELECT со скалярными подзапросами: один поход
+        # к читателю пула, и запрос целиком видит один снимок WAL - явная
+        # транзакция не нужна. Число пользователей - из счетчика app_stats
+        async with BaseRepository.acquire_read() as db:
             async with db.execute(
-                "SELECT COUNT(*) FROM analytics WHERE event='booking_cancelled'"
+                """SELECT
+                    (SELECT total_users FROM app_stats WHERE id = 1),
+                    (SELECT COUNT(*) FROM bookings),
+                    (SELECT COUNT(*) FROM analytics WHERE event='booking_cancelled'),
+                    (SELECT AVG(rating) FROM feedback)"""
             ) as cursor:
-                total_cancelled = (await cursor.fetchone())[0]
-
-            async with db.execute("SELECT AVG(rating) FROM feedback") as cursor:
-                result = await cursor.fetchone()
-                avg_rating = result[0] if result and result[0] else 0.0
+                total_users, active_bookings, total_cancelled, avg_rating = (
+                    await cursor.fetchone()
+                )
 
         return {
-            "total_users": total_users,
+            "total_users": total_users or 0,
             "active_bookings": active_bookings,
             "total_cancelled": total_cancelled,
-            "avg_rating": avg_rating,
+            "avg_rating": avg_rating or 0.0,
         }
 
     @staticmethod
@@ -46,7 +42,7 @@ class AnalyticsService:
         now = now_local()
         today_str = now.strftime("%Y-%m-%d")
 
-        async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with BaseRepository.acquire_snapshot() as db:
             # Проверка загрузки на сегодня
             async with db.execute(
                 "SELECT COUNT(*) FROM bookings WHERE date=?", (today_str,)
@@ -79,4 +75,4 @@ class AnalyticsService:
                     }
                 )
 
-        return recommendations
+            return recommendations
@@ -5,10 +5,11 @@ import sqlite3
 from datetime import timedelta
 from typing import Tuple
 
-import aiosqlite
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from config import DATABASE_PATH, MAX_BOOKINGS_PER_USER
+from config import MAX_BOOKINGS_PER_USER
+from database.base_repository import BaseRepository
+from database.cache import result_cache
 from database.queries import Database
 from utils.datetime_utils import now_local, parse_datetime
 
@@ -28,7 +29,7 @@ class BookingService:
         Returns:
             Tuple[bool, str]: (success, error_code)
         """
-        async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with BaseRepository.acquire_transactional() as db:
             # Начинаем транзакцию
             await db.execute("BEGIN IMMEDIATE")
 
@@ -37,8 +38,8 @@ class BookingService:
                 async with db.execute(
                     """SELECT 
                         (SELECT COUNT(*) FROM bookings WHERE user_id=? AND date >= date('now')) as user_count,
-                        (SELECT COUNT(*) FROM bookings WHERE date=? AND time=?) as slot_taken,
-                        (SELECT COUNT(*) FROM blocked_slots WHERE date=? AND time=?) as is_blocked
+                        EXISTS(SELECT 1 FROM bookings WHERE date=? AND time=?) as slot_taken,
+                        EXISTS(SELECT 1 FROM blocked_slots WHERE date=? AND time=?) as is_blocked
                     """,
                     (user_id, date_str, time_str, date_str, time_str),
                 ) as cursor:
@@ -69,6 +70,8 @@ class BookingService:
                 booking_id = cursor.lastrowid
 
                 await db.commit()
+                result_cache.invalidate_date(date_str)
+                result_cache.invalidate_user(user_id)
 
                 # Планируем напоминание (вне транзакции)
                 await self._schedule_reminder(booking_id, date_str, time_str, user_id)
@@ -103,7 +106,7 @@ class BookingService:
         Returns:
             Tuple[bool, str]: (success, error_code)
         """
-        async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with BaseRepository.acquire_transactional() as db:
             await db.execute("BEGIN IMMEDIATE")
 
             try:
@@ -120,8 +123,8 @@ class BookingService:
                 # 2. Проверяем что новый слот свободен И не заблокирован
                 async with db.execute(
                     """SELECT 
-                        (SELECT COUNT(*) FROM bookings WHERE date=? AND time=?) as booking_exists,
-                        (SELECT COUNT(*) FROM blocked_slots WHERE date=? AND time=?) as is_blocked
+                        EXISTS(SELECT 1 FROM bookings WHERE date=? AND time=?) as booking_exists,
+                        EXISTS(SELECT 1 FROM blocked_slots WHERE date=? AND time=?) as is_blocked
                     """,
                     (new_date_str, new_time_str, new_date_str, new_time_str),
                 ) as cursor:
@@ -153,6 +156,9 @@ class BookingService:
                         return False, "booking_not_found"
 
                     await db.commit()
+                    result_cache.invalidate_date(old_date_str)
+                    result_cache.invalidate_date(new_date_str)
+                    result_cache.invalidate_user(user_id)
 
                 except sqlite3.IntegrityError:
                     # Кто-то успел занять слот между проверкой и UPDATE
@@ -246,7 +252,7 @@ class BookingService:
     ) -> Tuple[bool, int]:
         """Отмена записи"""
         try:
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            async with BaseRepository.acquire_write() as db:
                 async with db.execute(
                     "SELECT id FROM bookings WHERE date=? AND time=? AND user_id=?",
                     (date_str, time_str, user_id),
@@ -259,6 +265,8 @@ class BookingService:
 
                 await db.execute("DELETE FROM bookings WHERE id=?", (booking_id,))
                 await db.commit()
+                result_cache.invalidate_date(date_str)
+                result_cache.invalidate_user(user_id)
 
             # Удаляем напоминания
             self._remove_job_safe(f"reminder_{booking_id}")
@@ -277,9 +285,14 @@ class BookingService:
         """Восстановить напоминания после рестарта (ИСПРАВЛЕНО: timezone)"""
         try:
             now = now_local()
-            async with aiosqlite.connect(DATABASE_PATH) as db:
+            # Прошедшие записи нужны только для запроса отзыва (через 2 часа
+            # после встречи) - более старые отсекает SQLite по индексу
+            # UNIQUE(date, time), разбирать их даты в Python не нужно
+            since = (now - timedelta(hours=2)).strftime("%Y-%m-%d")
+            async with BaseRepository.acquire_read() as db:
                 async with db.execute(
-                    "SELECT id, date, time, user_id FROM bookings"
+                    "SELECT id, date, time, user_id FROM bookings WHERE date >= ?",
+                    (since,),
                 ) as cursor:
                     all_bookings = await cursor.fetchall()
 
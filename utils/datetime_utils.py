@@ -1,8 +1,7 @@
 """Утилиты для работы с датами и временем"""
 
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 from typing import Optional
-import pytz
 from config import TIMEZONE
 
 
@@ -12,7 +11,7 @@ def now_local() -> datetime:
 
 
 def localize_datetime(dt: datetime) -> datetime:
-    """Безопасная локализация datetime с учетом DST
+    """Локализация datetime в TIMEZONE приложения
     
     Args:
         dt: Наивный datetime объект
@@ -24,15 +23,8 @@ def localize_datetime(dt: datetime) -> datetime:
         # Уже aware - конвертируем в нужную зону
         return dt.astimezone(TIMEZONE)
     
-    # Используем is_dst=None чтобы получить исключение при неоднозначности
-    try:
-        return TIMEZONE.localize(dt, is_dst=None)
-    except pytz.exceptions.AmbiguousTimeError:
-        # Время попадает на переход часов - используем стандартное время
-        return TIMEZONE.localize(dt, is_dst=False)
-    except pytz.exceptions.NonExistentTimeError:
-        # Время не существует (пропущено при переходе) - сдвигаем на час вперед
-        return TIMEZONE.localize(dt + timedelta(hours=1), is_dst=True)
+    # Фиксированное смещение без DST: неоднозначного или пропущенного времени нет
+    return dt.replace(tzinfo=TIMEZONE)
 
 
 def parse_datetime(date_str: str, time_str: str) -> datetime:
@@ -45,7 +37,9 @@ def parse_datetime(date_str: str, time_str: str) -> datetime:
     Returns:
         Aware datetime объект
     """
-    naive_dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+    # fromisoformat (C) в разы быстрее strptime - вызывается для каждой
+    # записи при восстановлении напоминаний
+    naive_dt = datetime.fromisoformat(f"{date_str}T{time_str}")
     return localize_datetime(naive_dt)
 
 
@@ -110,7 +104,7 @@ def to_utc(dt: datetime) -> datetime:
     """
     if dt.tzinfo is None:
         dt = localize_datetime(dt)
-    return dt.astimezone(pytz.UTC)
+    return dt.astimezone(timezone.utc)
 
 
 def from_utc(dt: datetime) -> datetime:
@@ -123,5 +117,5 @@ def from_utc(dt: datetime) -> datetime:
         Локальное aware datetime
     """
     if dt.tzinfo is None:
-        dt = pytz.UTC.localize(dt)
+        dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(TIMEZONE)
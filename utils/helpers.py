@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from config import DAY_NAMES, TIMEZONE
+from config import ADMIN_IDS, DAY_NAMES, TIMEZONE
 
 
 def now_local() -> datetime:
@@ -16,6 +16,15 @@ def format_date(date_obj: datetime) -> str:
     return f"{date_obj.strftime('%d.%m.%Y')} ({day_name})"
 
 
+def format_days_left(days_left: int) -> str:
+    """Подпись срока до записи"""
+    if days_left == 0:
+        return " — сегодня!"
+    elif days_left == 1:
+        return " — завтра"
+    return f" — через {days_left} дн."
+
+
 def create_ascii_chart(data: list, width: int = 7) -> str:
     """Создать ASCII-график для дашборда"""
     if not data or max(data) == 0:
@@ -34,5 +43,4 @@ def create_ascii_chart(data: list, width: int = 7) -> str:
 
 def is_admin(user_id: int) -> bool:
     """Проверка прав администратора (поддержка нескольких админов)"""
-    from config import ADMIN_IDS  # ИСПРАВЛЕНО: множественное число
     return user_id in ADMIN_IDS
@@ -0,0 +1,36 @@
+"""Ограничитель частоты для исходящих запросов к Telegram"""
+
+import asyncio
+
+
+class AsyncRateLimiter:
+    """Не больше rate операций в секунду на все корутины вместе
+
+    Каждый вход резервирует следующий свободный момент с шагом 1/rate,
+    и корутина спит только до своего момента: параллельные отправки
+    идут равномерно, без общего цикла опроса. Между чтением и записью
+    _next нет await, поэтому блокировка не нужна.
+    """
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: Операций в секунду
+        """
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self):
+        """Дождаться своей очереди"""
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
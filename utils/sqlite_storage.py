@@ -3,11 +3,24 @@ SQLite FSM Storage для сохранения состояний FSM
 Альтернатива MemoryStorage с персистентностью
 """
 
+import asyncio
 import json
 from typing import Dict, Any, Optional
 import aiosqlite
 from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
 
+# Размер кэша скомпилированных выражений соединения (см. database/pool.py)
+CACHED_STATEMENTS = 64
+
+# Применяются один раз при открытии соединения. Состояния FSM живут минуты -
+# synchronous=NORMAL в WAL не теряет целостность, а коммит обходится без fsync
+FSM_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+"""
+
 
 class SQLiteStorage(BaseStorage):
     """FSM storage на базе SQLite"""
@@ -22,62 +35,82 @@ class SQLiteStorage(BaseStorage):
         self.db_path = db_path
         self.state_ttl = state_ttl
         self.data_ttl = data_ttl
+
+        # TTL не меняется - текст запросов собирается один раз
+        self._get_state_sql = f"""SELECT state FROM fsm_states
+                WHERE bot_id=? AND user_id=? AND chat_id=?
+                AND datetime(updated_at, '+{state_ttl} seconds') > datetime('now')"""
+        self._get_data_sql = f"""SELECT data FROM fsm_data
+                WHERE bot_id=? AND user_id=? AND chat_id=?
+                AND datetime(updated_at, '+{data_ttl} seconds') > datetime('now')"""
+
+        # Одно соединение на всё время работы вместо нового на каждый вызов
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+
+    async def _get_db(self) -> aiosqlite.Connection:
+        """Соединение хранилища (открывается при первом обращении)"""
+        if self._db is None:
+            async with self._db_lock:
+                if self._db is None:
+                    # Автокоммит: каждая запись - отдельная короткая транзакция
+                    db = await aiosqlite.connect(
+                        self.db_path,
+                        isolation_level=None,
+                        cached_statements=CACHED_STATEMENTS,
+                    )
+                    await db.executescript(FSM_PRAGMAS)
+                    self._db = db
+        return self._db
     
     async def set_state(self, key: StorageKey, state: StateType = None) -> None:
         """Set state for specified key"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """INSERT OR REPLACE INTO fsm_states (bot_id, user_id, chat_id, state, updated_at)
-                VALUES (?, ?, ?, ?, datetime('now'))""",
-                (key.bot_id, key.user_id, key.chat_id, state)
-            )
-            await db.commit()
+        db = await self._get_db()
+        await db.execute(
+            """INSERT OR REPLACE INTO fsm_states (bot_id, user_id, chat_id, state, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now'))""",
+            (key.bot_id, key.user_id, key.chat_id, state)
+        )
     
     async def get_state(self, key: StorageKey) -> Optional[str]:
         """Get state for specified key"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                f"""SELECT state FROM fsm_states 
-                WHERE bot_id=? AND user_id=? AND chat_id=?
-                AND datetime(updated_at, '+{self.state_ttl} seconds') > datetime('now')""",
-                (key.bot_id, key.user_id, key.chat_id)
-            ) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else None
+        db = await self._get_db()
+        async with db.execute(
+            self._get_state_sql, (key.bot_id, key.user_id, key.chat_id)
+        ) as cursor:
+            result = await cursor.fetchone()
+            return result[0] if result else None
     
     async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
         """Set data for specified key"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """INSERT OR REPLACE INTO fsm_data (bot_id, user_id, chat_id, data, updated_at)
-                VALUES (?, ?, ?, ?, datetime('now'))""",
-                (key.bot_id, key.user_id, key.chat_id, json.dumps(data, ensure_ascii=False))
-            )
-            await db.commit()
+        db = await self._get_db()
+        await db.execute(
+            """INSERT OR REPLACE INTO fsm_data (bot_id, user_id, chat_id, data, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now'))""",
+            (key.bot_id, key.user_id, key.chat_id, json.dumps(data, ensure_ascii=False))
+        )
     
     async def get_data(self, key: StorageKey) -> Dict[str, Any]:
         """Get data for specified key"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                f"""SELECT data FROM fsm_data 
-                WHERE bot_id=? AND user_id=? AND chat_id=?
-                AND datetime(updated_at, '+{self.data_ttl} seconds') > datetime('now')""",
-                (key.bot_id, key.user_id, key.chat_id)
-            ) as cursor:
-                result = await cursor.fetchone()
-                return json.loads(result[0]) if result else {}
+        db = await self._get_db()
+        async with db.execute(
+            self._get_data_sql, (key.bot_id, key.user_id, key.chat_id)
+        ) as cursor:
+            result = await cursor.fetchone()
+            return json.loads(result[0]) if result else {}
     
     async def close(self) -> None:
         """Close storage (cleanup if needed)"""
         # Удаляем устаревшие записи
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                f"DELETE FROM fsm_states WHERE datetime(updated_at, '+{self.state_ttl} seconds') < datetime('now')"
-            )
-            await db.execute(
-                f"DELETE FROM fsm_data WHERE datetime(updated_at, '+{self.data_ttl} seconds') < datetime('now')"
-            )
-            await db.commit()
+        db = await self._get_db()
+        await db.execute(
+            f"DELETE FROM fsm_states WHERE datetime(updated_at, '+{self.state_ttl} seconds') < datetime('now')"
+        )
+        await db.execute(
+            f"DELETE FROM fsm_data WHERE datetime(updated_at, '+{self.data_ttl} seconds') < datetime('now')"
+        )
+        await db.close()
+        self._db = None
 
 
 async def init_fsm_storage(db_path: str = "fsm_storage.db"):